@@ -0,0 +1,72 @@
+import time
+import tracemalloc
+
+import pandas as pd
+
+from storage import _split
+from storage.compact import Vocabulary, ListColumn
+
+LIST_COLUMNS = ['Directors', 'genres', 'Actors']
+SIZES = [1000, 10000, 100000]
+
+
+def make_df(size: int) -> pd.DataFrame:
+    """
+    Create the text columns of a catalogue with the same shape as top_films.csv
+
+    @param size: Number of films
+    @return: A Dataframe with the directors, genres and actors of every film separated by ', '
+    """
+    return pd.DataFrame({'Directors': [f'Director {index % (size // 4 + 1)}' for index in range(size)],
+                         'genres': [', '.join(f'Genre {(index + i) % 300}' for i in range(6)) for index in range(size)],
+                         'Actors': [', '.join(f'Actor {(index * 7 + i) % (size // 2 + 1)}' for i in range(12))
+                                    for index in range(size)]})
+
+
+def measure(build) -> tuple[object, int]:
+    """
+    Memory kept by an object after building it
+
+    @param build: Function that builds the object
+    @return: The object and the bytes allocated by build that are still in use
+    """
+    tracemalloc.start()
+    built = build()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return built, memory
+
+
+def count_lists(lists: pd.Series) -> dict[str, int]:
+    # the counting of the visualization before the compact table
+    counting = {}
+    lists.apply(lambda names: [counting.update({name.strip(): counting.get(name.strip(), 0) + 1})
+                               for name in names or []])
+    return dict(list(dict(sorted(counting.items(), key=lambda item: item[1], reverse=True)).items())[:20])
+
+
+def main() -> None:
+    print(f"{'films':>8} {'lists (MB)':>11} {'compact (MB)':>13} {'ratio':>6} "
+          f"{'count lists (s)':>16} {'count compact (s)':>18}")
+    for size in SIZES:
+        df = make_df(size)
+        lists, lists_memory = measure(lambda: {column: df[column].map(_split) for column in LIST_COLUMNS})
+
+        vocabulary = Vocabulary()
+        compact, compact_memory = measure(
+            lambda: {column: ListColumn.from_lists(df[column].map(_split), vocabulary) for column in LIST_COLUMNS})
+
+        start = time.perf_counter()
+        expected = [count_lists(lists[column]) for column in LIST_COLUMNS]
+        lists_time = time.perf_counter() - start
+        start = time.perf_counter()
+        counted = [dict(compact[column].top(20)) for column in LIST_COLUMNS]
+        compact_time = time.perf_counter() - start
+        assert [list(top.values()) for top in counted] == [list(top.values()) for top in expected]
+
+        print(f"{size:>8} {lists_memory / 1e6:>11.1f} {compact_memory / 1e6:>13.1f} "
+              f"{lists_memory / compact_memory:>5.0f}x {lists_time:>16.3f} {compact_time:>18.3f}")
+
+
+if __name__ == '__main__':
+    main()
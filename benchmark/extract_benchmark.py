@@ -0,0 +1,137 @@
+import sys
+import time
+
+from scraper.netflix import CARDS_SCOPE, VOTED_CARD_SPEC
+from scraper.utils.document import Document
+
+SIZES = [100, 1000, 5000]
+REPEAT = 3
+
+
+def make_card(index: int) -> str:
+    """
+    Create a film card with the same shape as the cards of the Netflix's most voted content
+
+    @param index: Number of the card
+    @return: Html of the card
+    """
+    flags = ''.join(f'<img class="nflag" alt="Country {(index + i) % 40}" src="flag.png">'
+                    for i in range(1 + index % 3))
+    if index % 5:
+        genres = ('<div class="types-wrapper">'
+                  + ''.join(f'<span class="type">Genre {(index + i) % 20}</span>' for i in range(3)) + '</div>')
+    else:
+        genres = '<a class="genre" href="#">Documentary</a>'
+    return f'''
+    <div class="top-movie">
+      <div class="mc-poster"><a href="/us/film{index}.html"><img src="poster.jpg"></a></div>
+      <div class="mc-data">
+        <div class="mc-title"><a href="/us/film{index}.html" title=" Film {index} ">Film {index}</a>
+          <span class="date">{1990 + index % 35}</span></div>
+        <div>{flags}</div>
+        {genres}
+        <div class="mc-director"><a href="#">Director {index % 300}</a></div>
+      </div>
+      <div class="mc-right">
+        <div class="avg-rating">{5 + index % 50 / 10:.1f}</div>
+        <div class="rat-count countcat">{index * 7 % 10000}</div>
+      </div>
+    </div>'''
+
+
+def make_page(n_cards: int) -> str:
+    """
+    Create a page of the Netflix's most voted content
+
+    @param n_cards: Number of film cards
+    @return: Html of the page
+    """
+    cards = ''.join(make_card(index) for index in range(n_cards))
+    return f'<html><head><title>Netflix</title></head><body><div id="top-movies">{cards}</div></body></html>'
+
+
+def legacy_card(film) -> dict:
+    """
+    Extract a card with a find/find_all per field, as get_voted_df did before the specs
+
+    @param film: Element of the card
+    @return: Dictionary with the fields of the card
+    """
+    release_year = None
+    release_year_html = film.find("span", class_="date")
+    if release_year_html:
+        release_year = release_year_html.text.strip()
+
+    countries_html = film.find("div", class_="mc-data")
+    countries = list()
+    if countries_html and countries_html.find("div", class_=False):
+        for country in countries_html.find("div", class_=False).find_all('img', class_='nflag'):
+            countries.append(country['alt'])
+
+    genres_html = film.find(class_='types-wrapper')
+    genres = list()
+    if genres_html:
+        for genre in genres_html.find_all(class_="type"):
+            genres.append(genre.text)
+    elif film.find_all('a', class_='genre'):
+        for genre in film.find_all('a', class_='genre'):
+            genres.append(genre.text)
+
+    title_html = film.find("a", title=True)
+    title = title_html['title'].strip() if title_html else None
+    url = title_html['href'] if title_html and title_html.has_attr('href') else None
+
+    votes_html = film.find(class_="rat-count countcat")
+    votes = votes_html.text.strip() if votes_html else None
+
+    rating_html = film.find(class_="avg-rating")
+    rating = rating_html.text.strip() if rating_html else None
+
+    return {'date': release_year, 'countries': countries, 'genres': genres, 'title': title, 'votes': votes,
+            'rating': rating, 'url': url}
+
+
+def bench(extract, cards: list) -> tuple[float, list]:
+    """
+    Extract all the cards several times and keep the best time
+
+    @param extract: Function that extracts the list of cards
+    @param cards: Elements of the cards
+    @return: Cards per second and the extracted cards
+    """
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = extract(cards)
+        best = min(best, time.perf_counter() - start)
+    return len(cards) / best, result
+
+
+def bench_page(name: str, html: str) -> None:
+    cards = Document(html, CARDS_SCOPE).find_all("div", class_="top-movie")
+    legacy_speed, legacy_result = bench(lambda items: [legacy_card(card) for card in items], cards)
+    spec_speed, spec_result = bench(VOTED_CARD_SPEC.extract_all, cards)
+    same = 'yes' if legacy_result == spec_result else 'NO'
+    print(f"{name:>20} {len(cards):>7} {legacy_speed:>14.0f} {spec_speed:>14.0f} "
+          f"{spec_speed / legacy_speed:>7.1f}x {same:>5}")
+
+
+def main(paths: list[str]) -> None:
+    """
+    Compare the cards per second of the find/find_all extraction and the spec extraction
+
+    @param paths: Saved pages of the most voted content, synthetic pages are generated if none is given
+    @return: None
+    """
+    print(f"{'page':>20} {'cards':>7} {'find (cards/s)':>14} {'spec (cards/s)':>14} {'speedup':>8} {'same':>5}")
+    if paths:
+        for path in paths:
+            with open(path, encoding='utf-8') as file:
+                bench_page(path[-20:], file.read())
+    else:
+        for size in SIZES:
+            bench_page(f'synthetic {size}', make_page(size))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
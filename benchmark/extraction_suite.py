@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import platform
+import time
+import tracemalloc
+from datetime import datetime
+
+from benchmark.extract_benchmark import make_card
+from scraper import top_films, releases, netflix
+from scraper.utils.document import Document
+from scraper.utils.rows import RowBuilder
+from scraper.utils.registry import film_id, FILM_ID_DTYPES
+from constants import HOME_PATH, HTML_PARSER
+
+SIZES = [100, 1000, 10000, 100000]
+RESULTS_PATH = os.path.join(HOME_PATH, 'benchmark', 'results')
+
+# Film pages are cycled from a small set, generating 100k different pages would only measure the generator
+DISTINCT_PAGES = 100
+
+
+def page(body: str) -> str:
+    """
+    Wrap the content of a page with the head, menu and footer that every filmaffinity page has
+
+    @param body: Main content of the page
+    @return: Html of the page
+    """
+    scripts = ''.join(f'<script src="/js/bundle{i}.js"></script>' for i in range(10))
+    menu = ''.join(f'<li><a href="/us/section{i}.html">Section {i}</a></li>' for i in range(60))
+    footer = ''.join(f'<p>Footer text {i} with some links <a href="#">here</a></p>' for i in range(20))
+    return (f'<html><head><title>FilmAffinity</title>{scripts}</head><body><div id="header"><ul>{menu}</ul></div>'
+            f'<div id="main">{body}</div><div id="footer">{footer}</div></body></html>')
+
+
+def make_listing(n_cards: int) -> str:
+    """
+    Top 1000 FA with all the films loaded
+
+    @param n_cards: Number of films
+    @return: Html of the page
+    """
+    cards = ''.join(f'''
+    <li><div class="movie-card"><div class="mc-poster"><img src="poster{i}.jpg"></div>
+      <div class="mc-info-container"><div class="mc-title"><a href="https://www.filmaffinity.com/us/film{i}.html"
+        title="Film {i}">Film {i}</a> ({1950 + i % 75})</div>
+      <div class="mc-director"><a href="#">Director {i % 300}</a></div>
+      <div class="mc-cast"><a href="#">Actor {i % 5000}</a>, <a href="#">Actor {(i + 1) % 5000}</a></div></div>
+      <div class="avgrat-box">{5 + i % 50 / 10:.1f}</div></div></li>''' for i in range(n_cards))
+    return page(f'<ul id="top-movies">{cards}</ul><div class="show-more">Show more</div>')
+
+
+def make_film_page(index: int) -> str:
+    """
+    Page of a film with the fields read by the top films and the releases scrapers
+
+    @param index: Number of the film
+    @return: Html of the page
+    """
+    actors = ''.join(f'<a href="#">Actor {(index + i) % 5000}</a>' for i in range(12))
+    genres = ''.join(f'<a href="#">Genre {(index + i) % 20}</a>' for i in range(3))
+    reviews = ''.join(f'<div class="review"><p>Review {i} of the film {index}. ' + 'Lorem ipsum dolor sit amet. ' * 10
+                      + '</p></div>' for i in range(15))
+    return page(f'''
+    <h1 id="main-title"><span itemprop="name">Film {index}</span></h1>
+    <dl class="movie-info">
+      <dt>Original title</dt><dd>Film {index}</dd>
+      <dt>Year</dt><dd>{1950 + index % 75}</dd>
+      <dt>Running time</dt><dd> {80 + index % 90} min. </dd>
+      <dt>Country</dt><dd>United States</dd>
+      <dt>Director</dt><dd class="directors"><span class="credits"><a href="#">Director {index % 300}</a></span></dd>
+      <dt>Cast</dt><dd class="card-cast-debug">{actors}<a href="#">More</a></dd>
+      <dt>Producer</dt><dd class="card-producer">Studio {index % 40}, Producer {index % 90}</dd>
+      <dt>Genre</dt><dd class="card-genres">{genres}</dd>
+    </dl>
+    <div class="reviews">{reviews}</div>''')
+
+
+def make_box_office(n_cards: int) -> str:
+    """
+    Box office page, the table of Box Office USA is after the table of another country
+
+    @param n_cards: Number of rows of the table of Box Office USA
+    @return: Html of the page
+    """
+    def table(name: str, n_rows: int) -> str:
+        header = ''.join(f'<th>{column}</th>' for column in ['Title', 'Gross', 'Genre', 'Weeks'])
+        body = ''.join(f'<tr><td><a href="/us/film{i}.html">Film {i}</a></td><td>${i * 1000 % 9999999}</td><td>Genre {i % 20}</td>'
+                       f'<td>{i % 12}</td></tr>' for i in range(n_rows))
+        return (f'<div class="box-office"><div class="header">{name} <span>weekend</span></div>'
+                f'<table><thead><tr>{header}</tr></thead><tbody>{body}</tbody></table></div>')
+
+    return page(table('Box Office Spain', 20) + table(releases.BOX_OFFICE_NAME, n_cards))
+
+
+def make_netflix_voted(n_cards: int) -> str:
+    """
+    Netflix's most voted content
+
+    @param n_cards: Number of film cards
+    @return: Html of the page
+    """
+    return page(''.join(make_card(index) for index in range(n_cards)))
+
+
+def make_netflix_releases(n_cards: int) -> str:
+    """
+    New Netflix releases, grouped by release date in groups of 10 films
+
+    @param n_cards: Number of film cards
+    @return: Html of the page
+    """
+    groups = list()
+    for start in range(0, n_cards, 10):
+        cards = ''.join(make_card(index) for index in range(start, min(start + 10, n_cards)))
+        groups.append(f'<div id="main-wrapper-rdcat"><div class="rdate-cat rdate-cat-first">Date {start // 10}</div>'
+                      f'{cards}</div>')
+    return page(''.join(groups) + '<a class="button-np-cat next-date-cat" href="#">Next</a>')
+
+
+def extract_listing(html_content: str) -> int:
+    return len(top_films.get_title_list(html_content))
+
+
+def extract_top_film(html_content: str) -> int:
+    top_films.get_data(Document(html_content, top_films.FILM_SCOPE))
+    return 1
+
+
+def extract_release_film(html_content: str) -> int:
+    releases.get_data(Document(html_content, releases.FILM_SCOPE))
+    return 1
+
+
+def extract_box_office(html_content: str) -> int:
+    # same steps as get_final_df_box when the page_source is read
+    df_columns, table_rows, table_urls = releases.get_box_office_table(Document(html_content))
+    rows = RowBuilder(df_columns + ['Film_id'], FILM_ID_DTYPES)
+    rows.extend(dict(zip(df_columns, item_list), Film_id=film_id(movie_url))
+                for item_list, movie_url in zip(table_rows, table_urls))
+    return len(rows.to_df())
+
+
+def extract_netflix_voted(html_content: str) -> int:
+    return len(netflix.get_voted_df(Document(html_content, netflix.CARDS_SCOPE)))
+
+
+def extract_netflix_releases(html_content: str) -> int:
+    return len(netflix.get_releases_data(Document(html_content, netflix.RELEASES_SCOPE)))
+
+
+# name: (function that creates the pages for a number of cards, extractor that returns the number of cards)
+SINGLE_PAGE = {
+    'top_films.get_urls': (make_listing, extract_listing),
+    'releases.get_final_df_box': (make_box_office, extract_box_office),
+    'netflix.get_voted_df': (make_netflix_voted, extract_netflix_voted),
+    'netflix.get_releases_data': (make_netflix_releases, extract_netflix_releases),
+}
+FILM_PAGES = {
+    'top_films.get_data': extract_top_film,
+    'releases.get_data': extract_release_film,
+}
+
+
+def run(pages: list[str], n_pages: int, extract) -> tuple[float, int]:
+    """
+    Extract n_pages pages, cycling the given ones
+
+    @param pages: Html of the pages
+    @param n_pages: Number of pages to extract
+    @param extract: Extractor that returns the number of cards of a page
+    @return: Seconds spent and number of cards extracted
+    """
+    n_cards = 0
+    start = time.perf_counter()
+    for index in range(n_pages):
+        n_cards += extract(pages[index % len(pages)])
+    return time.perf_counter() - start, n_cards
+
+
+def measure(name: str, size: int, pages: list[str], n_pages: int, extract) -> dict:
+    """
+    Measure the speed of an extractor, and its peak memory in a second run (tracemalloc slows it down)
+
+    @param name: Name of the extractor
+    @param size: Number of cards of the benchmark
+    @param pages: Html of the pages
+    @param n_pages: Number of pages to extract
+    @param extract: Extractor that returns the number of cards of a page
+    @return: Result of the benchmark
+    """
+    seconds, n_cards = run(pages, n_pages, extract)
+
+    tracemalloc.start()
+    run(pages, n_pages, extract)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {'extractor': name,
+              'size': size,
+              'pages': n_pages,
+              'cards': n_cards,
+              'html_mb': round(sum(len(html_content) for html_content in pages) / 1024 / 1024, 3),
+              'seconds': round(seconds, 4),
+              'pages_per_second': round(n_pages / seconds, 1),
+              'cards_per_second': round(n_cards / seconds, 1),
+              'peak_memory_mb': round(peak / 1024 / 1024, 2)}
+    print(f"{name:>28} {size:>7} {n_pages:>7} {n_cards:>7} {result['pages_per_second']:>10.1f} "
+          f"{result['cards_per_second']:>11.1f} {result['peak_memory_mb']:>9.1f}")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark of the extractors with synthetic filmaffinity pages")
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help="number of cards of every benchmark")
+    parser.add_argument('--only', nargs='+', help="names of the extractors to run")
+    parser.add_argument('--output', help="json file of the results, by default a new file in benchmark/results")
+    args = parser.parse_args()
+
+    print(f"{'extractor':>28} {'size':>7} {'pages':>7} {'cards':>7} {'pages/s':>10} {'cards/s':>11} "
+          f"{'peak MB':>9}")
+    results = list()
+    for size in args.sizes:
+        for name, (make_page, extract) in SINGLE_PAGE.items():
+            if not args.only or name in args.only:
+                results.append(measure(name, size, [make_page(size)], 1, extract))
+
+        film_pages = [make_film_page(index) for index in range(min(size, DISTINCT_PAGES))]
+        for name, extract in FILM_PAGES.items():
+            if not args.only or name in args.only:
+                results.append(measure(name, size, film_pages, size, extract))
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_PATH, exist_ok=True)
+        output = os.path.join(RESULTS_PATH, f"extraction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w') as file:
+        json.dump({'created': datetime.now().isoformat(),
+                   'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'html_parser': HTML_PARSER,
+                   'results': results}, file, indent=2)
+    print(f"Results saved in {output}")
+
+
+if __name__ == '__main__':
+    main()
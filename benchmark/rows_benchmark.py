@@ -0,0 +1,63 @@
+import time
+
+import pandas as pd
+
+from scraper.utils.rows import RowBuilder
+
+COLUMNS = ['Title', 'Directors', 'genres', 'Actors']
+SIZES = [1000, 10000, 100000]
+
+
+def make_row(index: int) -> dict:
+    """
+    Create a row with the same shape as the rows of top_films.csv
+
+    @param index: Number of the row
+    @return: A dictionary with the value of every column
+    """
+    return {'Title': f'Film {index}',
+            'Directors': f'Director {index % 300}',
+            'genres': 'Drama, Crime, Family Relationships',
+            'Actors': ', '.join(f'Actor {(index + i) % 5000}' for i in range(10))}
+
+
+def bench_loc(rows: list[dict]) -> float:
+    """
+    Build the DataFrame adding every row with df.loc[len(df)], as the scrapers did before
+
+    @param rows: Rows to add
+    @return: Seconds spent
+    """
+    start = time.perf_counter()
+    df = pd.DataFrame(columns=COLUMNS)
+    for row in rows:
+        df.loc[len(df)] = row
+    return time.perf_counter() - start
+
+
+def bench_builder(rows: list[dict]) -> float:
+    """
+    Build the DataFrame with the columnar RowBuilder
+
+    @param rows: Rows to add
+    @return: Seconds spent
+    """
+    start = time.perf_counter()
+    builder = RowBuilder(COLUMNS)
+    for row in rows:
+        builder.append(row)
+    builder.to_df()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    print(f"{'rows':>8} {'df.loc (s)':>12} {'RowBuilder (s)':>15} {'speedup':>9}")
+    for size in SIZES:
+        rows = [make_row(index) for index in range(size)]
+        loc_time = bench_loc(rows)
+        builder_time = bench_builder(rows)
+        print(f"{size:>8} {loc_time:>12.3f} {builder_time:>15.3f} {loc_time / builder_time:>8.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,122 @@ import os
 HOME_PATH = os.getcwd()
 DATA_PATH = os.path.join(HOME_PATH, 'data')
 IMAGES_PATH = os.path.join(HOME_PATH, 'images')
+CACHE_PATH = os.path.join(HOME_PATH, 'cache')
+JOURNAL_PATH = os.path.join(HOME_PATH, 'journal')
 
 MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October',
                'November', 'December']
 WEEK_DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
 
+MAIN_URL = 'https://www.filmaffinity.com/us/main.html'
+
 COLORS = ['red', 'blue', 'green', 'yellow', 'orange', 'purple', 'cyan', 'magenta', 'brown', 'pink', 'olive',
           'teal', 'navy']
+
+# Number of browsers that crawl the film pages at the same time (capped by MAX_WORKERS to be polite with FA)
+TOP_FILMS_WORKERS = 4
+MAX_WORKERS = 8
+PAGE_LOAD_DELAY = 0.5
+PAGE_WAIT_TIMEOUT = 10
+
+# Lean browser profile, it lowers the time and memory of every page when several browsers are running
+LEAN_BROWSER = True
+LEAN_PROFILE = {
+    'headless': True,
+    'page_load_strategy': 'eager',  # 'normal', 'eager' or 'none'
+    'block_images': True,
+    'block_media': True,
+    'block_fonts': True,
+    'block_css': False,  # the buttons of the listings are only clickable with their styles
+    'block_third_party': True,  # trackers and the scripts that are not served by filmaffinity
+}
+
+# Backends used to download the pages of the films
+SELENIUM_BACKEND = 'selenium'
+HTTP_BACKEND = 'http'
+ASYNC_BACKEND = 'async'
+TOP_FILMS_BACKEND = ASYNC_BACKEND
+RELEASES_BACKEND = ASYNC_BACKEND
+RELEASES_WORKERS = 1
+
+HTTP_TIMEOUT = 30
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64; rv:123.0) Gecko/20100101 Firefox/123.0',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+}
+
+# Limits of the asyncio crawler
+MAX_REQUESTS_PER_SECOND = 5
+MAX_REQUESTS_PER_HOST = 8
+
+# On-disk cache of the downloaded pages
+CACHE_ENABLED = True
+CACHE_MAX_SIZE = 200 * 1024 * 1024
+LOCALE = 'us'
+LISTING_PAGE = 'listing'
+DETAIL_PAGE = 'detail'
+CACHE_TTL = {
+    LISTING_PAGE: 6 * 60 * 60,
+    DETAIL_PAGE: 7 * 24 * 60 * 60,
+}
+
+# Only the new films of the top 1000 FA or the ones extracted more than TOP_FILMS_REFRESH_DAYS ago are extracted again
+TOP_FILMS_INCREMENTAL = True
+TOP_FILMS_REFRESH_DAYS = 30
+
+# Parser used by BeautifulSoup, lxml is much faster than the parser of the standard library
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Execute the three scrapers at the same time in different processes, with at most MAX_BROWSERS browsers in total
+CONCURRENT_SCRAPERS = False
+MAX_BROWSERS = 6
+
+# Extract the listings and tables with a script inside the browser instead of sending the whole page_source
+JS_EXTRACTION = True
+
+# Load the whole top 1000 FA with a single script that clicks "show-more" inside the browser
+JS_LOAD_ALL = True
+TOP_FILMS_TARGET = 1000
+LOAD_ALL_TIMEOUT = 600
+SHOW_MORE_STALL = 10
+
+# Number of the next Netflix releases pages loaded in other tabs while the current one is extracted, 0 to click
+# the next button in the same tab
+NETFLIX_PREFETCH_DEPTH = 2
+
+# Record every page read by the scrapers in a single compressed archive, or run the scrapers from it without network
+# nor browser to measure and compare the extraction. None for normal runs
+RECORD_MODE = 'record'
+REPLAY_MODE = 'replay'
+ARCHIVE_MODE = None
+ARCHIVE_PATH = os.path.join(HOME_PATH, 'archive', 'pages.jsonl.gz')
+
+# Durations of the stages of the run (histograms with count, p50, p95 and max) saved as json at the end of the run,
+# and as a Prometheus textfile if a path is given (for example in the textfile directory of the node exporter)
+METRICS_ENABLED = True
+METRICS_PATH = os.path.join(HOME_PATH, 'log', 'run_metrics.json')
+PROMETHEUS_TEXTFILE = None
+
+# CPU and memory profiles of every scraper and visualization (python main.py --profile)
+PROFILE_PATH = os.path.join(HOME_PATH, 'log', 'profile')
+
+# Pipeline of main.py pipeline, it keeps the hashes of the files of every stage to execute only the stages whose
+# files changed, with at most PIPELINE_WORKERS stages at the same time
+PIPELINE_STATE_PATH = os.path.join(HOME_PATH, 'log', 'pipeline.json')
+PIPELINE_WORKERS = 4
+
+# Format of the datasets of the data folder. The parquet files keep the lists (genres, actors, directors, countries
+# and producers) as list columns and the numbers as typed columns, they need pyarrow (pip install pyarrow)
+CSV_FORMAT = 'csv'
+PARQUET_FORMAT = 'parquet'
+STORAGE_FORMAT = CSV_FORMAT
+
+# Normalized SQLite database of the films (people, genres, countries, credits, box office and netflix rankings),
+# written by the scrapers alongside the datasets. The visualizations count the top films with indexed queries
+FILM_DATABASE = False
+FILM_DATABASE_PATH = os.path.join(DATA_PATH, 'films.db')
@@ -0,0 +1,178 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from functools import wraps
+
+from constants import METRICS_ENABLED, METRICS_PATH, PROMETHEUS_TEXTFILE
+
+QUANTILES = (0.5, 0.95)
+
+# Returned by stage() when the metrics are disabled, so a disabled stage costs a single method call
+_DISABLED_STAGE = nullcontext()
+
+
+def _quantile(values: list[float], quantile: float) -> float:
+    # nearest rank of the sorted values
+    return values[max(0, math.ceil(quantile * len(values)) - 1)]
+
+
+class _Stage(object):
+    def __init__(self, metrics: 'Metrics', name: str):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self) -> '_Stage':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+class Metrics(object):
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        """
+        Durations of the stages of a run (navigation, sleeps, waits, page_source, parsing, extraction...), every
+        stage keeps all its samples to summarize them as a histogram at the end of the run
+
+        @param enabled: Measure the stages, when it is False stage() and timed() do nothing
+        """
+        self.enabled = enabled
+        self.started = datetime.now()
+        self._samples = dict()
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float) -> None:
+        """
+        Add a sample to a stage
+
+        @param name: Name of the stage
+        @param seconds: Duration of the sample
+        @return: None
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+
+    def stage(self, name: str):
+        """
+        Context manager that measures the code inside it
+
+        @param name: Name of the stage
+        @return: A context manager
+        """
+        if not self.enabled:
+            return _DISABLED_STAGE
+        return _Stage(self, name)
+
+    def timed(self, name: str):
+        """
+        Decorator that measures every call of a function
+
+        @param name: Name of the stage
+        @return: The decorator
+        """
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Stage(self, name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def samples(self) -> dict[str, list[float]]:
+        """
+        Copy of the samples, used to send them from the processes of the scrapers to the main one
+
+        @return: Dictionary with the samples of every stage
+        """
+        with self._lock:
+            return {name: list(values) for name, values in self._samples.items()}
+
+    def merge(self, samples: dict[str, list[float]]) -> None:
+        """
+        Add the samples measured in another process
+
+        @param samples: Dictionary with the samples of every stage
+        @return: None
+        """
+        with self._lock:
+            for name, values in samples.items():
+                self._samples.setdefault(name, []).extend(values)
+
+    def summary(self) -> dict[str, dict]:
+        """
+        Histogram of every stage
+
+        @return: Dictionary with the count, total, p50, p95 and maximum seconds of every stage
+        """
+        summary = dict()
+        for name, values in sorted(self.samples().items()):
+            values.sort()
+            summary[name] = {'count': len(values),
+                             'sum': round(sum(values), 6),
+                             'p50': round(_quantile(values, 0.5), 6),
+                             'p95': round(_quantile(values, 0.95), 6),
+                             'max': round(values[-1], 6)}
+        return summary
+
+    def to_prometheus(self, summary: dict[str, dict]) -> str:
+        """
+        Histograms in the Prometheus text format, as summaries with the quantiles 0.5 and 0.95
+
+        @param summary: Result of summary()
+        @return: Text of the metrics
+        """
+        lines = ['# HELP filmaffinity_stage_seconds Duration of the stages of the last run',
+                 '# TYPE filmaffinity_stage_seconds summary']
+        for name, stage in summary.items():
+            for quantile, key in zip(QUANTILES, ('p50', 'p95')):
+                lines.append(f'filmaffinity_stage_seconds{{stage="{name}",quantile="{quantile}"}} {stage[key]}')
+            lines.append(f'filmaffinity_stage_seconds_sum{{stage="{name}"}} {stage["sum"]}')
+            lines.append(f'filmaffinity_stage_seconds_count{{stage="{name}"}} {stage["count"]}')
+
+        lines += ['# HELP filmaffinity_stage_max_seconds Longest sample of the stages of the last run',
+                  '# TYPE filmaffinity_stage_max_seconds gauge']
+        for name, stage in summary.items():
+            lines.append(f'filmaffinity_stage_max_seconds{{stage="{name}"}} {stage["max"]}')
+
+        lines += ['# HELP filmaffinity_last_run_timestamp_seconds End of the last run',
+                  '# TYPE filmaffinity_last_run_timestamp_seconds gauge',
+                  f'filmaffinity_last_run_timestamp_seconds {time.time():.0f}']
+        return '\n'.join(lines) + '\n'
+
+    def save(self, path: str = METRICS_PATH, textfile: str = PROMETHEUS_TEXTFILE) -> None:
+        """
+        Write the run report as json and, if a path is given, the Prometheus textfile
+
+        @param path: Path of the json report
+        @param textfile: Path of the Prometheus textfile (a .prom file of the node exporter textfile directory)
+        @return: None
+        """
+        if not self.enabled:
+            return
+
+        summary = self.summary()
+        report = {'started': self.started.isoformat(),
+                  'finished': datetime.now().isoformat(),
+                  'seconds': round((datetime.now() - self.started).total_seconds(), 3),
+                  'stages': summary}
+        with open(path, 'w') as file:
+            json.dump(report, file, indent=2)
+
+        if textfile:
+            # the node exporter could read a half written file, it is replaced at once
+            temporary = f'{textfile}.{os.getpid()}.tmp'
+            with open(temporary, 'w') as file:
+                file.write(self.to_prometheus(summary))
+            os.replace(temporary, textfile)
+
+
+metrics = Metrics()
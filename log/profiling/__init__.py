@@ -0,0 +1,95 @@
+import contextlib
+import cProfile
+import logging
+import os
+import pstats
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+from constants import PROFILE_PATH
+
+TOP_ALLOCATIONS = 25
+TOP_FUNCTIONS = 40
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler(object):
+    def __init__(self, path: str = PROFILE_PATH):
+        """
+        CPU profile (cProfile) and memory (tracemalloc) of the stages of a run, it is disabled until enable() is
+        called (python main.py --profile)
+
+        @param path: Folder of the profiles, every stage writes NAME.prof (open it with pstats or snakeviz) and
+                     NAME.txt (peak memory, top allocations and the slowest functions)
+        """
+        self.path = path
+        self.enabled = False
+
+    def enable(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        self.enabled = True
+
+    def stage(self, name: str):
+        """
+        Context manager that profiles the code inside it, only the calls of the current thread are in the CPU profile
+
+        @param name: Name of the stage, used as the name of its files
+        @return: A context manager
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._profile(name)
+
+    @contextmanager
+    def _profile(self, name: str):
+        own_tracing = not tracemalloc.is_tracing()
+        if own_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot()
+            if own_tracing:
+                tracemalloc.stop()
+            self._save(name, profile, peak, snapshot)
+
+    def _save(self, name: str, profile: cProfile.Profile, peak: int, snapshot: tracemalloc.Snapshot) -> None:
+        """
+        Write the files of a stage
+
+        @param name: Name of the stage
+        @param profile: CPU profile of the stage
+        @param peak: Peak of the memory traced during the stage, in bytes
+        @param snapshot: Memory still allocated at the end of the stage
+        @return: None
+        """
+        profile.dump_stats(os.path.join(self.path, f'{name}.prof'))
+
+        # the allocations of the profiler itself are not interesting
+        snapshot = snapshot.filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                           tracemalloc.Filter(False, contextlib.__file__),
+                                           tracemalloc.Filter(False, __file__),
+                                           tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')))
+        report = os.path.join(self.path, f'{name}.txt')
+        with open(report, 'w') as file:
+            file.write(f"Stage {name}\n")
+            file.write(f"Peak memory: {peak / 1024 / 1024:.1f} MB\n\n")
+
+            file.write(f"Top {TOP_ALLOCATIONS} allocations still alive at the end of the stage:\n")
+            for statistic in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+                file.write(f"    {statistic}\n")
+
+            file.write(f"\nTop {TOP_FUNCTIONS} functions by cumulative time:\n")
+            pstats.Stats(profile, stream=file).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+
+        logger.info(f"Profile of {name} saved in {report}")
+
+
+profiler = Profiler()
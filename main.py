@@ -1,8 +1,121 @@
+import argparse
+import sys
+
 from log.config import config_logging
-from scraper.main_scraper import main as main_scraper
-from visualization.main_visualization import main as main_visualization
+from log.metrics import metrics
+from log.profiling import profiler
+
+# The scrapers and the visualizations are imported only by the commands that execute them, so running a single
+# visualization does not load selenium and running a single scraper does not load matplotlib
+
+
+def scrape(parser: argparse.ArgumentParser, names: list[str]) -> int:
+    """
+    Execute the scrapers
+
+    @param parser: Parser of the arguments, to report unknown scrapers
+    @param names: Names of the scrapers, all of them if it is empty
+    @return: The exit status, 0 if all the scrapers worked and 1 otherwise
+    """
+    from scraper.main_scraper import main as main_scraper, SCRAPERS
+
+    unknown = [name for name in names if name not in SCRAPERS]
+    if unknown:
+        parser.error(f"unknown scrapers {', '.join(unknown)} (choose from {', '.join(SCRAPERS)})")
+    return main_scraper(names=names)
+
+
+def visualize(parser: argparse.ArgumentParser, names: list[str]) -> int:
+    """
+    Execute the visualizations
+
+    @param parser: Parser of the arguments, to report unknown visualizations
+    @param names: Names of the visualizations, all of them if it is empty
+    @return: The exit status, always 0 (a failed visualization raises its error)
+    """
+    from visualization.main_visualization import main as main_visualization, VISUALIZATIONS
+
+    unknown = [name for name in names if name not in VISUALIZATIONS]
+    if unknown:
+        parser.error(f"unknown visualizations {', '.join(unknown)} (choose from {', '.join(VISUALIZATIONS)})")
+    main_visualization(names)
+    return 0
+
+
+def run_all(parser: argparse.ArgumentParser, names: list[str]) -> int:
+    """
+    Execute all the scrapers and then all the visualizations
+
+    @param parser: Parser of the arguments
+    @param names: Not used, the command has no names
+    @return: The exit status of the scrapers
+    """
+    exit_status = scrape(parser, [])
+    visualize(parser, [])
+    return exit_status
+
+
+def pipeline(parser: argparse.ArgumentParser, names: list[str], force: list[str] | None = None,
+             sequential: bool = False) -> int:
+    """
+    Execute the stages of the pipeline whose files changed
+
+    @param parser: Parser of the arguments, to report unknown stages
+    @param names: Names of the stages to build, all of them if it is empty
+    @param force: Names of the stages to execute even if they are up to date, all the stages to build if it is empty
+    @param sequential: Execute the stages one after another in this process
+    @return: The exit status, 0 if all the stages worked or were up to date and 1 otherwise
+    """
+    from pipeline.runner import run, STAGES
+
+    unknown = [name for name in names + (force or []) if name not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+    if force == []:
+        force = names or list(STAGES)
+    return run(names, force, parallel=not sequential)
+
+
+def get_parser() -> argparse.ArgumentParser:
+    profile_help = "save a CPU and memory profile of every scraper and visualization in log/profile"
+    parser = argparse.ArgumentParser(description="Scrape FilmAffinity and create the visualizations")
+    parser.add_argument('--profile', action='store_true', help=profile_help)
+    parser.set_defaults(command=run_all, names=[])
+
+    # options of every command, a command does not set the ones it does not receive so the ones given before it are kept
+    options = argparse.ArgumentParser(add_help=False)
+    options.add_argument('--profile', action='store_true', default=argparse.SUPPRESS, help=profile_help)
+
+    commands = parser.add_subparsers(title='commands', metavar='{all,scrape,visualize,pipeline}')
+    commands.add_parser('all', parents=[options],
+                        help="execute all the scrapers and then all the visualizations (default)")
+    scrape_parser = commands.add_parser('scrape', parents=[options], help="execute the scrapers")
+    scrape_parser.add_argument('names', nargs='*', metavar='scraper',
+                               help="top_films, releases or netflix, all of them by default")
+    scrape_parser.set_defaults(command=scrape)
+    visualize_parser = commands.add_parser('visualize', parents=[options], help="execute the visualizations")
+    visualize_parser.add_argument('names', nargs='*', metavar='visualization',
+                                  help="netflix, releases or top_films, all of them by default")
+    visualize_parser.set_defaults(command=visualize)
+    pipeline_parser = commands.add_parser('pipeline', parents=[options],
+                                          help="execute only the stages whose files changed")
+    pipeline_parser.add_argument('names', nargs='*', metavar='stage',
+                                 help="stages to build (scraper.NAME or visualization.NAME), all of them by default")
+    pipeline_parser.add_argument('--force', nargs='*', metavar='stage',
+                                 help="execute these stages even if they are up to date, all of them without names")
+    pipeline_parser.add_argument('--sequential', action='store_true', help="execute the stages one after another")
+    pipeline_parser.set_defaults(command=pipeline)
+    return parser
+
 
 if __name__ == '__main__':
+    parser = get_parser()
+    args = parser.parse_args()
+
     config_logging()
-    main_scraper()
-    main_visualization()
+    if args.profile:
+        profiler.enable()
+    options = {key: value for key, value in vars(args).items() if key in ('force', 'sequential')}
+    exit_status = args.command(parser, args.names, **options)
+    metrics.save()
+    sys.exit(exit_status)
@@ -0,0 +1,276 @@
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from pipeline import logger
+from pipeline.stages import Stage, STAGES, get_upstream
+from log.config import config_logging
+from log.metrics import metrics
+from log.profiling import profiler
+from constants import HOME_PATH, PIPELINE_STATE_PATH, PIPELINE_WORKERS, MAX_BROWSERS, ARCHIVE_MODE
+
+# Set in the processes of the stages by _init_worker
+_browser_slots = None
+
+
+class PipelineState(object):
+    def __init__(self, path: str = PIPELINE_STATE_PATH):
+        """
+        Hashes of the files of the last successful run of every stage. The hash of a file is reused while its size and
+        modification time do not change, so checking a stage that did not change does not read its files
+
+        @param path: Json file of the state
+        """
+        self.path = path
+        self.files = dict()
+        self.stages = dict()
+        if os.path.exists(path):
+            with open(path) as file:
+                state = json.load(file)
+            self.files = state.get('files', dict())
+            self.stages = state.get('stages', dict())
+
+    def file_hash(self, path: str) -> str:
+        """
+        Content hash of a file
+
+        @param path: Path of an existing file
+        @return: sha1 of the file
+        """
+        key = os.path.relpath(path, HOME_PATH)
+        info = os.stat(path)
+        cached = self.files.get(key)
+        if cached and cached[0] == info.st_size and cached[1] == info.st_mtime_ns:
+            return cached[2]
+
+        sha1 = hashlib.sha1()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                sha1.update(chunk)
+        self.files[key] = [info.st_size, info.st_mtime_ns, sha1.hexdigest()]
+        return sha1.hexdigest()
+
+    def hashes(self, patterns: tuple[str, ...]) -> dict[str, str | None]:
+        """
+        Content hash of every path or glob pattern
+
+        @param patterns: Paths or glob patterns of files
+        @return: Dictionary with the hash of every pattern, None if no file matches it
+        """
+        hashes = dict()
+        for pattern in patterns:
+            paths = sorted(glob.glob(pattern))
+            if len(paths) == 1 and paths[0] == pattern:
+                hashes[os.path.relpath(pattern, HOME_PATH)] = self.file_hash(pattern)
+            elif paths:
+                sha1 = hashlib.sha1()
+                for path in paths:
+                    sha1.update(f'{os.path.relpath(path, HOME_PATH)}:{self.file_hash(path)}\n'.encode('utf-8'))
+                hashes[os.path.relpath(pattern, HOME_PATH)] = sha1.hexdigest()
+            else:
+                hashes[os.path.relpath(pattern, HOME_PATH)] = None
+        return hashes
+
+    def is_up_to_date(self, stage: Stage, inputs: dict[str, str | None]) -> bool:
+        """
+        Check if a stage ran with the same inputs and its outputs were not changed or deleted since then. A stage
+        without inputs (a scraper) is up to date while its outputs exist
+
+        @param stage: Stage to check
+        @param inputs: Current hashes of the inputs of the stage
+        @return: True if the stage does not need to run
+        """
+        if not stage.inputs:
+            return None not in self.hashes(stage.outputs).values()
+
+        last_run = self.stages.get(stage.name)
+        if last_run is None or last_run['inputs'] != inputs:
+            return False
+        outputs = self.hashes(stage.outputs)
+        return None not in outputs.values() and last_run['outputs'] == outputs
+
+    def record(self, stage: Stage, inputs: dict[str, str | None]) -> None:
+        """
+        Save a successful run of a stage
+
+        @param stage: Stage that ran
+        @param inputs: Hashes of the inputs of the stage when it started
+        @return: None
+        """
+        self.stages[stage.name] = {'inputs': inputs, 'outputs': self.hashes(stage.outputs)}
+
+    def forget(self, stage: Stage) -> None:
+        """
+        Remove the last run of a stage, so it runs again the next time
+
+        @param stage: Stage that failed
+        @return: None
+        """
+        self.stages.pop(stage.name, None)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temporary = f'{self.path}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump({'files': self.files, 'stages': self.stages}, file, indent=2)
+        os.replace(temporary, self.path)
+
+
+def _init_worker(browser_slots) -> None:
+    """
+    Configure the log and the browser limit of a new stage process
+
+    @param browser_slots: Semaphore shared by all the processes to limit the number of browsers
+    @return: None
+    """
+    global _browser_slots
+    config_logging()
+    _browser_slots = browser_slots
+
+
+def _run_stage(name: str, session=None) -> tuple[str | None, dict[str, list[float]]]:
+    """
+    Execute a stage
+
+    @param name: Name of the stage in STAGES
+    @param session: BrowserSession shared by the scraper stages executed in this process, None to use their own one
+    @return: None if the stage worked, otherwise the traceback of the error. And the samples of the metrics of the
+             process, to be merged in the main one
+    """
+    stage = STAGES[name]
+    try:
+        if stage.browser and _browser_slots is not None:
+            from scraper.utils.driver import set_browser_slots
+            set_browser_slots(_browser_slots)
+        with metrics.stage(name), profiler.stage(name):
+            if stage.browser and session is not None:
+                stage.load()(session)
+            else:
+                stage.load()()
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+    return error, metrics.samples()
+
+
+def get_selected(targets: list[str], upstream: dict[str, set[str]]) -> list[str]:
+    """
+    Stages needed to build the targets
+
+    @param targets: Names of the stages to build, all of them if it is empty
+    @param upstream: Dependencies of every stage
+    @return: The targets and all the stages they depend on, in the order of STAGES
+    """
+    selected = set()
+    pending = list(targets or STAGES)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(upstream[name])
+    return [name for name in STAGES if name in selected]
+
+
+def run(targets: list[str] | None = None, force: list[str] | None = None, parallel: bool = True,
+        workers: int = PIPELINE_WORKERS, max_browsers: int = MAX_BROWSERS) -> int:
+    """
+    Execute the stages whose inputs changed since their last run or whose outputs are missing, a stage starts as soon
+    as the stages it depends on finish
+
+    @param targets: Names of the stages to build, with the stages they depend on. All of them by default
+    @param force: Names of the stages to execute even if they are up to date
+    @param parallel: Execute the independent stages at the same time, each one in its own process
+    @param workers: Maximum number of stages executed at the same time
+    @param max_browsers: Maximum number of browsers running at the same time among all the processes
+    @return: The exit status, 0 if all the stages worked or were up to date and 1 otherwise
+    """
+    force = set(force or [])
+    upstream = get_upstream(STAGES)
+    selected = get_selected(targets or [], upstream)
+    state = PipelineState()
+
+    # the profiles are taken in this process, and the archive records a single browser session in order
+    if profiler.enabled or ARCHIVE_MODE:
+        parallel = False
+
+    pending = {name: upstream[name] & set(selected) for name in selected}
+    finished, failed = set(), set()
+    running = dict()
+    executor = None
+    session = None
+
+    if ARCHIVE_MODE:
+        # the same setup as main_scraper: the cache would hide pages from the archive, and the scraper stages share
+        # one browser session so the calls are recorded and replayed in the same order
+        from scraper.utils.archive import page_archive
+        from scraper.utils.cache import html_cache
+        from scraper.utils.driver import BrowserSession
+        html_cache.enabled = False
+        page_archive.open()
+        session = BrowserSession()
+
+    def finish(name: str, inputs: dict[str, str | None], error: str | None) -> None:
+        finished.add(name)
+        if error:
+            failed.add(name)
+            state.forget(STAGES[name])
+            logger.error(f"The stage {name} failed:\n{error}")
+        else:
+            state.record(STAGES[name], inputs)
+            logger.info(f"The stage {name} finished correctly")
+
+    try:
+        while pending or running:
+            ready = [name for name, dependencies in pending.items() if dependencies <= finished]
+            for name in ready:
+                del pending[name]
+                stage = STAGES[name]
+                if upstream[name] & failed:
+                    finished.add(name)
+                    failed.add(name)
+                    logger.warning(f"The stage {name} was not executed because a stage it depends on failed")
+                    continue
+
+                inputs = state.hashes(stage.inputs)
+                if name not in force and state.is_up_to_date(stage, inputs):
+                    finished.add(name)
+                    logger.info(f"The stage {name} is up to date")
+                    continue
+
+                if not parallel:
+                    error, _ = _run_stage(name, session)
+                    finish(name, inputs, error)
+                    continue
+
+                if executor is None:
+                    # a new process for every stage, so the metrics of a process belong to a single stage
+                    context = multiprocessing.get_context('spawn')
+                    executor = ProcessPoolExecutor(max_workers=workers, mp_context=context, max_tasks_per_child=1,
+                                                   initializer=_init_worker,
+                                                   initargs=(context.BoundedSemaphore(max_browsers),))
+                running[executor.submit(_run_stage, name)] = (name, inputs)
+
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, inputs = running.pop(future)
+                    try:
+                        error, samples = future.result()
+                        metrics.merge(samples)
+                    except Exception:
+                        # the process died without returning (for example killed by the system)
+                        error = traceback.format_exc()
+                    finish(name, inputs, error)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if session is not None:
+            session.close()
+            page_archive.close()
+        state.save()
+
+    return 1 if failed else 0
@@ -0,0 +1,99 @@
+import importlib
+import os
+
+from constants import DATA_PATH, IMAGES_PATH, STORAGE_FORMAT, FILM_DATABASE, FILM_DATABASE_PATH
+
+
+class Stage(object):
+    def __init__(self, name: str, module: str, function: str, inputs: tuple[str, ...] = (),
+                 outputs: tuple[str, ...] = (), browser: bool = False):
+        """
+        Step of the pipeline with the files it reads and writes, a stage depends on the stages that write its inputs
+
+        @param name: Name of the stage, the same as its metrics stage
+        @param module: Module of the function of the stage, imported only when the stage runs
+        @param function: Function of the module that executes the stage
+        @param inputs: Paths of the files read by the stage
+        @param outputs: Paths or glob patterns of the files written by the stage
+        @param browser: The stage opens a browser, so it counts for MAX_BROWSERS
+        """
+        self.name = name
+        self.module = module
+        self.function = function
+        self.inputs = inputs
+        self.outputs = outputs
+        self.browser = browser
+
+    def load(self):
+        """
+        Import the module of the stage
+
+        @return: The function that executes the stage
+        """
+        return getattr(importlib.import_module(self.module), self.function)
+
+
+def _data(*names: str) -> tuple[str, ...]:
+    # the same paths as storage.dataset_path, without importing pandas
+    return tuple(os.path.join(DATA_PATH, f'{name}.{STORAGE_FORMAT}') for name in names)
+
+
+def _images(*names: str) -> tuple[str, ...]:
+    return tuple(os.path.join(IMAGES_PATH, name) for name in names)
+
+
+# The scrapers read the web, they have no inputs and only run when their datasets are missing or forced
+STAGES = {stage.name: stage for stage in [
+    Stage('scraper.top_films', 'scraper.top_films', 'start_scrapper',
+          outputs=_data('top_films'), browser=True),
+    Stage('scraper.releases', 'scraper.releases', 'start_scrapper',
+          outputs=_data('releases', 'box_office'), browser=True),
+    Stage('scraper.netflix', 'scraper.netflix', 'start_scrapper',
+          outputs=_data('netflix_releases', 'netflix_most_voted', 'netflix_best'), browser=True),
+    Stage('visualization.netflix', 'visualization.netflix_visualization', 'start_visualization',
+          inputs=_data('netflix_releases', 'netflix_most_voted', 'netflix_best'),
+          outputs=_images('netflix_*.png')),
+    Stage('visualization.releases', 'visualization.releases_visualization', 'start_visualization',
+          inputs=_data('releases', 'box_office'),
+          outputs=_images('box_office.png', 'top_producers.png')),
+    # the counts of the top films plot are read from the database when it is used
+    Stage('visualization.top_films', 'visualization.top_films_visualization', 'start_visualization',
+          inputs=_data('top_films') + ((FILM_DATABASE_PATH,) if FILM_DATABASE else ()),
+          outputs=_images('collaboration_directors_actors.png', 'combined_plot.png')),
+]}
+
+
+def get_upstream(stages: dict[str, Stage]) -> dict[str, set[str]]:
+    """
+    Dependencies between the stages, a stage depends on every other stage that writes one of its inputs
+
+    @param stages: Stages by name
+    @return: Dictionary with the names of the stages every stage depends on
+    """
+    writers = dict()
+    for stage in stages.values():
+        for path in stage.outputs:
+            writers[path] = stage.name
+
+    upstream = {name: set() for name in stages}
+    for stage in stages.values():
+        for path in stage.inputs:
+            if path in writers and writers[path] != stage.name:
+                upstream[stage.name].add(writers[path])
+
+    # a cycle would leave its stages waiting forever
+    visited, visiting = set(), set()
+
+    def visit(name: str) -> None:
+        if name in visiting:
+            raise ValueError(f"The stage {name} depends on itself")
+        if name not in visited:
+            visiting.add(name)
+            for dependency in upstream[name]:
+                visit(dependency)
+            visiting.remove(name)
+            visited.add(name)
+
+    for name in stages:
+        visit(name)
+    return upstream
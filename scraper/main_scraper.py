@@ -1,18 +1,153 @@
-from scraper.top_films import start_scrapper as top_scraper
-from scraper.releases import start_scrapper as releases_scraper
-from scraper.netflix import start_scrapper as netflix_scraper
+from scraper.utils.cache import html_cache
+from scraper.utils.archive import page_archive
+from scraper.utils.registry import film_registry
+from log.metrics import metrics
+from log.profiling import profiler
+from scraper.utils.driver import BrowserSession, set_browser_slots
+from log.config import config_logging
+from constants import CONCURRENT_SCRAPERS, MAX_BROWSERS
 
+import importlib
 import logging
+import multiprocessing
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 
+# name of every scraper and the module of its start_scrapper, the module is imported only if the scraper runs
+SCRAPERS = {
+    'top_films': 'scraper.top_films',
+    'releases': 'scraper.releases',
+    'netflix': 'scraper.netflix',
+}
 
-def main() -> None:
+
+def get_scraper(name: str):
+    """
+    Import the module of a scraper
+
+    @param name: Name of the scraper in SCRAPERS
+    @return: The start_scrapper function of the scraper
+    """
+    return importlib.import_module(SCRAPERS[name]).start_scrapper
+
+
+def _init_worker(browser_slots) -> None:
+    """
+    Configure the log and the browser limit of a new scraper process
+
+    @param browser_slots: Semaphore shared by all the processes to limit the number of browsers
+    @return: None
+    """
+    config_logging()
+    set_browser_slots(browser_slots)
+
+
+def _run_scraper(name: str) -> tuple[str | None, dict[str, list[float]]]:
+    """
+    Execute a scraper in its own process, with its own browser
+
+    @param name: Name of the scraper in SCRAPERS
+    @return: None if the scraper worked, otherwise the traceback of the error. And the samples of the metrics of
+             the process, to be merged in the main one
+    """
+    try:
+        with metrics.stage(f'scraper.{name}'), profiler.stage(f'scraper.{name}'):
+            get_scraper(name)()
+        error = None
+    except Exception:
+        error = traceback.format_exc()
+
+    html_cache.log_summary()
+    film_registry.log_summary()
+    return error, metrics.samples()
+
+
+def run_sequential(names: list[str]) -> dict[str, str | None]:
+    """
+    Execute the scrapers one after another sharing the same browser
+
+    @param names: Names of the scrapers to execute
+    @return: A dictionary with the name of every scraper and its error (None if it worked)
+    """
+    errors = dict()
+    with BrowserSession() as session:
+        for name in names:
+            try:
+                with metrics.stage(f'scraper.{name}'), profiler.stage(f'scraper.{name}'):
+                    get_scraper(name)(session)
+                errors[name] = None
+            except Exception:
+                errors[name] = traceback.format_exc()
+
+    html_cache.log_summary()
+    film_registry.log_summary()
+    return errors
+
+
+def run_concurrent(names: list[str], max_browsers: int = MAX_BROWSERS) -> dict[str, str | None]:
+    """
+    Execute every scraper in its own process at the same time
+
+    @param names: Names of the scrapers to execute
+    @param max_browsers: Maximum number of browsers running at the same time among all the processes
+    @return: A dictionary with the name of every scraper and its error (None if it worked)
+    """
+    context = multiprocessing.get_context('spawn')
+    browser_slots = context.BoundedSemaphore(max_browsers)
+
+    # a new process for every scraper, so the metrics of a process belong to a single scraper
+    n_processes = min(len(names), max_browsers)
+    with ProcessPoolExecutor(max_workers=n_processes, mp_context=context, max_tasks_per_child=1,
+                             initializer=_init_worker, initargs=(browser_slots,)) as executor:
+        futures = {name: executor.submit(_run_scraper, name) for name in names}
+
+        errors = dict()
+        for name, future in futures.items():
+            try:
+                errors[name], samples = future.result()
+                metrics.merge(samples)
+            except Exception:
+                # the process died without returning (for example killed by the system)
+                errors[name] = traceback.format_exc()
+
+    return errors
+
+
+def main(concurrent: bool = CONCURRENT_SCRAPERS, names: list[str] | None = None) -> int:
     """
     This function initialize the scraper log and calls all scrapers
 
-    @return:Save all the data extracted into several csv located in the data folder
+    @param concurrent: Execute every scraper in its own process at the same time instead of one after another
+    @param names: Names of the scrapers to execute, in this order. All of them by default
+    @return: Save all the data extracted into several csv located in the data folder. Returns the exit status, 0 if
+             all the scrapers worked and 1 otherwise
     """
     logger = logging.getLogger("scraper")
+    names = list(names or SCRAPERS)
+
+    # the profiles are taken in this process
+    if profiler.enabled:
+        concurrent = False
+
+    # the archive records the calls of a single browser session in order, and the cache would hide pages from it
+    if page_archive.mode:
+        concurrent = False
+        html_cache.enabled = False
+        page_archive.open()
+
     # execute scrappers
-    top_scraper()
-    releases_scraper()
-    netflix_scraper()
+    try:
+        if concurrent:
+            errors = run_concurrent(names)
+        else:
+            errors = run_sequential(names)
+    finally:
+        page_archive.close()
+
+    for name, error in errors.items():
+        if error:
+            logger.error(f"The {name} scraper failed:\n{error}")
+        else:
+            logger.info(f"The {name} scraper finished correctly")
+
+    return 1 if any(errors.values()) else 0
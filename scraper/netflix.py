@@ -1,120 +1,192 @@
-import os
-import time
+from collections import deque
 
 from scraper import logger
 import pandas as pd
 
-from bs4 import BeautifulSoup
-
-from selenium import webdriver
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from constants import DATA_PATH
-
-
-def get_releases_data(driver) -> list[dict]:
+from scraper.utils.driver import BrowserSession, use_session, open_tab, wait_for, pause
+from scraper.utils.document import Document, scope
+from scraper.utils.rows import RowBuilder
+from scraper.utils.spec import CardSpec, Field
+from scraper.utils.registry import film_id, FILM_ID_DTYPES
+from log.metrics import metrics
+from storage import save_dataset
+from scraper.utils.js import run_script, CARDS_SCRIPT, NEXT_DATE_SCRIPT
+from constants import JS_EXTRACTION, NETFLIX_PREFETCH_DEPTH, PAGE_WAIT_TIMEOUT
+
+# Only the film cards and the button of the next page are parsed
+RELEASES_SCOPE = scope(classes=('next-date-cat',), ids=('main-wrapper-rdcat',))
+CARDS_SCOPE = scope(classes=('top-movie',))
+RELEASES_LOCATOR = (By.ID, 'main-wrapper-rdcat')
+
+# Fields of the film cards, the alternatives of a field are tried in order. They are read by the spec extraction
+# and by CARDS_SCRIPT when JS_EXTRACTION is set
+# the genres of the types-wrapper if the card has it (even if it has none), the genre links otherwise
+GENRES = Field('genres', (('.types-wrapper', '.type'), 'a.genre'), many=True)
+# the flags of the first div without class of the card data
+COUNTRIES = Field('countries', (('div.mc-data div:not([class])', 'img.nflag'),), attr='alt', many=True)
+TITLE = Field('title', 'a[title]', attr='title', strip=True)
+URL = Field('url', 'a[title]', attr='href')
+RELEASE_DATE_SPEC = CardSpec([Field('date', ('.rdate-cat.rdate-cat-first', '.rdate-cat'), strip=True)])
+RELEASES_CARD_SPEC = CardSpec([Field('countries', 'img.nflag', attr='alt', many=True), GENRES, TITLE, URL])
+VOTED_CARD_SPEC = CardSpec([Field('date', 'span.date', strip=True),
+                            COUNTRIES,
+                            GENRES,
+                            TITLE,
+                            URL,
+                            Field('votes', '.rat-count.countcat', strip=True),
+                            Field('rating', '.avg-rating', strip=True)])
+BEST_CARD_SPEC = CardSpec([Field('date', 'span.date', strip=True),
+                           COUNTRIES,
+                           GENRES,
+                           TITLE,
+                           URL,
+                           Field('votes', '.rat-count', strip=True),
+                           Field('rating', '.avg-rating', strip=True)])
+
+
+@metrics.timed('extract')
+def get_releases_data(document: Document) -> list[dict]:
     """
     This function extract the title, origin country, genre and release date of every film
 
-    @param driver: Driver of the webpage of new Netflix releases
+    @param document: Document of the webpage of new Netflix releases
     @return: List of rows to be added to the Dataframe
     """
-    html_content = driver.page_source
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    several_films = soup.find_all("div", id="main-wrapper-rdcat")
+    several_films = document.find_all("div", id="main-wrapper-rdcat")
 
     new_rows = list()
     for films in several_films:
         # Get release date
-        date_release_html = films.find(class_="rdate-cat rdate-cat-first")
-        date_release = None
-        if date_release_html:
-            date_release = date_release_html.text.strip()
-        elif films.find(class_="rdate-cat"):
-            date_release = films.find(class_="rdate-cat").text.strip()
-        else:
+        date_release = RELEASE_DATE_SPEC.extract(films)['date']
+        if date_release is None:
             logger.error("Couldn't get the release date")
 
-        for film in films.find_all(class_="top-movie"):
-            # Get countries
-            country_html = film.find_all('img', class_='nflag')
-            countries = list()
-            if country_html:
-                for country in country_html:
-                    countries.append(country['alt'])
-            else:
+        for card in RELEASES_CARD_SPEC.extract_all(films.find_all(class_="top-movie")):
+            if not card['countries']:
                 logger.error("Could not find country")
-
-            # Get genres
-            genres_html = film.find(class_='types-wrapper')
-            genres = list()
-            if genres_html:
-                for genre in genres_html.find_all(class_="type"):
-                    genres.append(genre.text)
-            elif film.find_all('a', class_='genre'):
-                for genre in film.find_all('a', class_='genre'):
-                    genres.append(genre.text)
-            else:
+            if not card['genres']:
                 logger.error('Could not get genres')
-
-            # Get title
-            title_html = film.find("a", title=True)
-            title = None
-            if title_html:
-                title = title_html['title'].strip()
-            else:
+            if card['title'] is None:
                 logger.error('Could not get the title')
 
             # Add new row
-            new_row = {'Title': title,
-                       'Origin_country': str(countries)[1:-1].replace('\'', ''),
-                       'genres': str(genres)[1:-1].replace('\'', ''),
-                       'Release_date': date_release}
+            new_row = {'Title': card['title'],
+                       'Origin_country': card['countries'],
+                       'genres': card['genres'],
+                       'Release_date': date_release,
+                       'Film_id': film_id(card['url'])}
             new_rows.append(new_row)
 
     return new_rows
 
 
-def get_releases_df(driver) -> pd.DataFrame:
+def get_prefetched_pages(driver, depth: int):
     """
-    Extract the information of the new releases
+    Yield the documents of the new releases pages, the next pages are loaded in other tabs while the current one is
+    extracted. The tab of the first page is kept open and selected at the end
 
-    @param driver: Driver of the new Netflix releases
-    @return: A Pandas Dataframe that contains the title, origin country, genre and release date
+    @param driver: Driver of the first page of the new Netflix releases, its next date button has to be a link
+    @param depth: Number of pages loaded ahead of the current one
+    @return: Generator of the documents of every page
     """
-    df = pd.DataFrame(columns=['Title', 'Origin_country', 'genres', 'Release_date'])
-
-    rows_list = get_releases_data(driver)
-    for new_row in rows_list:
-        df.loc[len(df)] = new_row
+    main_tab = driver.current_window_handle
+    tabs = deque([main_tab])
+    visited = {driver.current_url}
+    exhausted = False
+    try:
+        while tabs:
+            # Keep the next pages loading, the url of each one is in the page before it
+            while not exhausted and len(tabs) <= depth:
+                driver.switch_to.window(tabs[-1])
+                wait_for(driver, RELEASES_LOCATOR)
+                next_date = run_script(driver, NEXT_DATE_SCRIPT, 'next date')
+                if not next_date['found']:
+                    exhausted = True
+                elif next_date['url'] is None or next_date['url'] in visited:
+                    logger.error(f"Could not get the next releases page from {driver.current_url}")
+                    exhausted = True
+                else:
+                    visited.add(next_date['url'])
+                    tabs.append(open_tab(driver, next_date['url']))
+
+            driver.switch_to.window(tabs[0])
+            wait_for(driver, RELEASES_LOCATOR)
+            yield Document.from_driver(driver, RELEASES_SCOPE)
+
+            if tabs.popleft() != main_tab:
+                driver.close()
+    finally:
+        for tab in tabs:
+            if tab != main_tab:
+                driver.switch_to.window(tab)
+                driver.close()
+        driver.switch_to.window(main_tab)
+
+
+def get_clicked_pages(driver):
+    """
+    Yield the documents of the new releases pages clicking the next date button in the same tab
 
-    html_content = driver.page_source
-    soup = BeautifulSoup(html_content, 'html.parser')
+    @param driver: Driver of the first page of the new Netflix releases
+    @return: Generator of the documents of every page
+    """
+    # The same document is used to extract the films and to look for the next page
+    document = Document.from_driver(driver, RELEASES_SCOPE)
+    yield document
 
     button_name = "button-np-cat next-date-cat"
-    while soup.find(class_=button_name):
+    while document.find(class_=button_name):
         netflixWeb = driver.find_element(By.CSS_SELECTOR, ".next-date-cat")
         if not netflixWeb.is_displayed():
             raise Exception()
 
-        # Get into the next webpage
+        # Get into the next webpage, it is loaded once the films of the current one are gone
+        current_films = driver.find_element(*RELEASES_LOCATOR)
         netflixWeb.location_once_scrolled_into_view
-        time.sleep(3)
+        WebDriverWait(driver, PAGE_WAIT_TIMEOUT).until(EC.element_to_be_clickable(netflixWeb))
         netflixWeb.click()
-        time.sleep(5)
-        html_content = driver.page_source
-        soup = BeautifulSoup(html_content, 'html.parser')
+        WebDriverWait(driver, PAGE_WAIT_TIMEOUT).until(EC.staleness_of(current_films))
+        wait_for(driver, RELEASES_LOCATOR)
+
+        document = Document.from_driver(driver, RELEASES_SCOPE)
+        yield document
+
+
+def get_releases_df(driver, prefetch_depth: int = NETFLIX_PREFETCH_DEPTH) -> pd.DataFrame:
+    """
+    Extract the information of the new releases
 
+    @param driver: Driver of the new Netflix releases
+    @param prefetch_depth: Number of next pages loaded in other tabs while the current one is extracted, 0 to click
+                           the next date button in the same tab
+    @return: A Pandas Dataframe that contains the title, origin country, genre and release date
+    """
+    rows = RowBuilder(['Title', 'Origin_country', 'genres', 'Release_date', 'Film_id'], FILM_ID_DTYPES)
+
+    wait_for(driver, RELEASES_LOCATOR)
+    if prefetch_depth > 0:
+        # The next pages can only be opened in other tabs if the button is a link
+        next_date = run_script(driver, NEXT_DATE_SCRIPT, 'next date')
+        if next_date['found'] and next_date['url'] is None:
+            logger.warning("The next date button is not a link, the pages are loaded clicking it")
+            prefetch_depth = 0
+
+    if prefetch_depth > 0:
+        pages = get_prefetched_pages(driver, prefetch_depth)
+    else:
+        pages = get_clicked_pages(driver)
+
+    for document in pages:
         # Add the information to the dataframe
-        rows_list = get_releases_data(driver)
-        for new_row in rows_list:
-            df.loc[len(df)] = new_row
+        rows.extend(get_releases_data(document))
 
-    return df
+    return rows.to_df()
 
 
+@metrics.timed('navigation')
 def get_netflix_page(driver) -> None:
     """
     This function gets into the new Netflix releases
@@ -122,17 +194,6 @@ def get_netflix_page(driver) -> None:
     @param driver: Driver of the main page
     @return: None
     """
-    try:
-        # Disagree cookies filmaffinity
-        text_to_find = "DISAGREE"
-        configCookies = driver.find_element(By.XPATH, f"//*[contains(text(), '{text_to_find}')]")
-        configCookies.click()
-    except Exception as e:
-        logger.error(f"Cookies could not been rejected: {e}")
-        raise Exception("Cookies could not been rejected:")
-
-    time.sleep(3)
-
     try:
         # Go to the Netflix releases page
         page_find = "Netflix (coming soon)"
@@ -146,6 +207,7 @@ def get_netflix_page(driver) -> None:
         raise Exception("Could not get into the Netflix webpage")
 
 
+@metrics.timed('navigation')
 def get_netflix_voted_page(driver) -> None:
     """
     This function gets into the netflix most voted content
@@ -180,83 +242,48 @@ def get_netflix_voted_page(driver) -> None:
         raise Exception("Could not get into the popularity Netflix webpage")
 
 
-def get_voted_df(driver) -> pd.DataFrame:
+@metrics.timed('extract')
+def get_document_cards_df(document: Document, spec: CardSpec) -> pd.DataFrame:
     """
-    Extract the information of the most voted content
+    Extract the information of the most voted or best content from the film cards of the page
 
-    @param driver: Driver of the Netflix's most voted content
+    @param document: Document of the Netflix's most voted or best content
+    @param spec: Spec of the film cards, VOTED_CARD_SPEC or BEST_CARD_SPEC
     @return: A Pandas Dataframe that contains the title, origin country, genres, release date, number of votes and rating
     """
-    html_content = driver.page_source
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    several_films = soup.find_all("div", class_="top-movie")
-
-    df = pd.DataFrame(columns=['Title', 'Origin_country', 'Genres', 'Release_date', 'n_votes', 'rating'])
-
-    for film in several_films:
-
-        # Get release year
-        release_year = None
-        release_year_html = film.find("span", class_="date")
-        if release_year_html:
-            release_year = release_year_html.text.strip()
-
-        countries_html = film.find("div", class_="mc-data")
-        countries = list()
-        if countries_html and countries_html.find("div", class_=False):
-            countries_html = countries_html.find("div", class_=False).find_all('img', class_='nflag')
-            try:
-                # Get Country
-                for country in countries_html:
-                    countries.append(country['alt'])
-            except Exception as e:
-                logger.error(f"Couldn't get the country{e}")
-
-        # Get genres
-        genres_html = film.find(class_='types-wrapper')
-        genres = list()
-        if genres_html:
-            for genre in genres_html.find_all(class_="type"):
-                genres.append(genre.text)
-        elif film.find_all('a', class_='genre'):
-            for genre in film.find_all('a', class_='genre'):
-                genres.append(genre.text)
-        else:
-            logger.error('Could not get genres')
+    rows = RowBuilder(['Title', 'Origin_country', 'Genres', 'Release_date', 'n_votes', 'rating', 'Film_id'],
+                      FILM_ID_DTYPES)
 
-        # Get title
-        title_html = film.find("a", title=True)
-        title = None
-        if title_html:
-            title = title_html['title'].strip()
-        else:
+    for card in spec.extract_all(document.find_all("div", class_="top-movie")):
+        if not card['genres']:
+            logger.error('Could not get genres')
+        if card['title'] is None:
             logger.error('Could not get the title')
 
-        # Get number of votes
-        votes_html = film.find(class_="rat-count countcat")
-        votes = None
-        if votes_html:
-            votes = votes_html.text.strip()
+        # Add new row
+        new_row = {'Title': card['title'],
+                   'Origin_country': card['countries'],
+                   'Genres': card['genres'],
+                   'Release_date': card['date'],
+                   'n_votes': card['votes'],
+                   'rating': card['rating'],
+                   'Film_id': film_id(card['url'])}
+        rows.append(new_row)
 
-        # Get rating
-        rating_html = film.find(class_="avg-rating")
-        rating = None
-        if rating_html:
-            rating = rating_html.text.strip()
+    return rows.to_df()
 
-        # Add new row
-        new_row = {'Title': title,
-                   'Origin_country': str(countries)[1:-1].replace('\'', ''),
-                   'Genres': str(genres)[1:-1].replace('\'', ''),
-                   'Release_date': release_year,
-                   'n_votes': votes,
-                   'rating': rating}
-        df.loc[len(df)] = new_row
 
-    return df
+def get_voted_df(document: Document) -> pd.DataFrame:
+    """
+    Extract the information of the most voted content
+
+    @param document: Document of the Netflix's most voted content
+    @return: A Pandas Dataframe that contains the title, origin country, genres, release date, number of votes and rating
+    """
+    return get_document_cards_df(document, VOTED_CARD_SPEC)
 
 
+@metrics.timed('navigation')
 def get_netflix_best_page(driver) -> None:
     """
     This function gets into the new Netflix best content
@@ -291,127 +318,86 @@ def get_netflix_best_page(driver) -> None:
         raise Exception("Could not get into the best rated Netflix webpage")
 
 
-def get_best_df(driver) -> pd.DataFrame:
+def get_best_df(document: Document) -> pd.DataFrame:
     """
     Extract the information of the best Netflix content
 
-    @param driver: Driver of the best Netflix content
+    @param document: Document of the best Netflix content
     @return: A Pandas Dataframe that contains the title, origin country, genres, release date, number of votes and rating
     """
-    html_content = driver.page_source
-    soup = BeautifulSoup(html_content, 'html.parser')
-
-    several_films = soup.find_all("div", class_="top-movie")
-
-    df = pd.DataFrame(columns=['Title', 'Origin_country', 'Genres', 'Release_date', 'n_votes', 'rating'])
-
-    for film in several_films:
-
-        # Get release year
-        release_year = None
-        release_year_html = film.find("span", class_="date")
-        if release_year_html:
-            release_year = release_year_html.text.strip()
-
-        countries_html = film.find("div", class_="mc-data")
-        countries = list()
-        if countries_html and countries_html.find("div", class_=False):
-            countries_html = countries_html.find("div", class_=False).find_all('img', class_='nflag')
-            try:
-                # Get Country
-                for country in countries_html:
-                    countries.append(country['alt'])
-            except Exception as e:
-                logger.error(f"Couldn't get the country{e}")
-
-        # Get genres
-        genres_html = film.find(class_='types-wrapper')
-        genres = list()
-        if genres_html:
-            for genre in genres_html.find_all(class_="type"):
-                genres.append(genre.text)
-        elif film.find_all('a', class_='genre'):
-            for genre in film.find_all('a', class_='genre'):
-                genres.append(genre.text)
-        else:
-            logger.error('Could not get genres')
+    return get_document_cards_df(document, BEST_CARD_SPEC)
 
-        # Get title
-        title_html = film.find("a", title=True)
-        title = None
-        if title_html:
-            title = title_html['title'].strip()
-        else:
-            logger.error('Could not get the title')
 
-        # Get number of votes
-        votes_html = film.find(class_="rat-count")
-        votes = None
-        if votes_html:
-            votes = votes_html.text.strip()
+def get_cards_df(driver, spec: CardSpec) -> pd.DataFrame:
+    """
+    Extract the information of the most voted or best content with a script inside the browser
 
-        # Get rating
-        rating_html = film.find(class_="avg-rating")
-        rating = None
-        if rating_html:
-            rating = rating_html.text.strip()
+    @param driver: Driver of the Netflix's most voted or best content
+    @param spec: Spec of the film cards, VOTED_CARD_SPEC or BEST_CARD_SPEC
+    @return: A Pandas Dataframe that contains the title, origin country, genres, release date, number of votes and rating
+    """
+    rows = RowBuilder(['Title', 'Origin_country', 'Genres', 'Release_date', 'n_votes', 'rating', 'Film_id'],
+                      FILM_ID_DTYPES)
+    for card in run_script(driver, CARDS_SCRIPT, 'netflix cards', 'div.top-movie', spec.definition()):
+        if not card['genres']:
+            logger.error('Could not get genres')
+        if card['title'] is None:
+            logger.error('Could not get the title')
 
         # Add new row
-        new_row = {'Title': title,
-                   'Origin_country': str(countries)[1:-1].replace('\'', ''),
-                   'Genres': str(genres)[1:-1].replace('\'', ''),
-                   'Release_date': release_year,
-                   'n_votes': votes,
-                   'rating': rating}
-        df.loc[len(df)] = new_row
+        new_row = {'Title': card['title'],
+                   'Origin_country': card['countries'],
+                   'Genres': card['genres'],
+                   'Release_date': card['date'],
+                   'n_votes': card['votes'],
+                   'rating': card['rating'],
+                   'Film_id': film_id(card['url'])}
+        rows.append(new_row)
 
-    return df
+    return rows.to_df()
 
 
-def start_scrapper() -> None:
+def start_scrapper(session: BrowserSession = None) -> None:
     """
     Web scraper for the new Netflix releases
 
-        @return:
+    @param session: Browser session shared with the other scrapers, a new browser is used if it is not given
+    @return:
     """
-    # Add options and initialize the webdriver
-    options = webdriver.FirefoxOptions()
-    options.add_argument("--disable-cookies")
-    driver = webdriver.Firefox(options=options)
-
-    # Get into the main webpage
-    driver.get("https://www.filmaffinity.com/us/main.html")
-    time.sleep(3)
-
-    # Go into the new Netflix releases webpage
-    get_netflix_page(driver)
-    time.sleep(3)
-
-    # Get and save the data containing the films
-    df = get_releases_df(driver)
-    df.to_csv(os.path.join(DATA_PATH, 'netflix_releases.csv'), index=False)
-    logger.info("Netflix new releases data correctly extracted")
-
-    # Go to the most voted netflix
-    driver.get("https://www.filmaffinity.com/us/main.html")
-    time.sleep(3)
-    get_netflix_voted_page(driver)
-    time.sleep(3)
-
-    # Get and save the data containing the films
-    df = get_voted_df(driver)
-    df.to_csv(os.path.join(DATA_PATH, 'netflix_most_voted.csv'), index=False)
-    logger.info("Netflix most voted content data correctly extracted")
-
-    # Go to the most voted netflix
-    driver.get("https://www.filmaffinity.com/us/main.html")
-    time.sleep(3)
-    get_netflix_best_page(driver)
-    time.sleep(3)
-
-    # Get and save the data containing the films
-    df = get_best_df(driver)
-    df.to_csv(os.path.join(DATA_PATH, 'netflix_best.csv'), index=False)
-    logger.info("Netflix best content data correctly extracted")
-
-    driver.quit()
+    with use_session(session) as session:
+        # Get into the main webpage
+        driver = session.open_main_page()
+
+        # Go into the new Netflix releases webpage
+        get_netflix_page(driver)
+
+        # Get and save the data containing the films
+        df = get_releases_df(driver)
+        save_dataset(df, 'netflix_releases')
+        logger.info("Netflix new releases data correctly extracted")
+
+        # Go to the most voted netflix
+        session.open_main_page()
+        get_netflix_voted_page(driver)
+        pause(3)
+
+        # Get and save the data containing the films
+        if JS_EXTRACTION:
+            df = get_cards_df(driver, VOTED_CARD_SPEC)
+        else:
+            df = get_voted_df(Document.from_driver(driver, CARDS_SCOPE))
+        save_dataset(df, 'netflix_most_voted')
+        logger.info("Netflix most voted content data correctly extracted")
+
+        # Go to the most voted netflix
+        session.open_main_page()
+        get_netflix_best_page(driver)
+        pause(3)
+
+        # Get and save the data containing the films
+        if JS_EXTRACTION:
+            df = get_cards_df(driver, BEST_CARD_SPEC)
+        else:
+            df = get_best_df(Document.from_driver(driver, CARDS_SCOPE))
+        save_dataset(df, 'netflix_best')
+        logger.info("Netflix best content data correctly extracted")
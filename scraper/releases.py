@@ -1,33 +1,39 @@
-import os
-import time
-
 from scraper import logger
 import pandas as pd
 
-from bs4 import BeautifulSoup
-
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from constants import DATA_PATH
-
-
-def get_final_df_box(driver) -> pd.DataFrame:
+from scraper.utils.driver import BrowserSession, use_session, pause
+from scraper.utils.pool import crawl_pages
+from scraper.utils.journal import Journal
+from scraper.utils.document import Document, scope
+from scraper.utils.rows import RowBuilder
+from scraper.utils.registry import film_id, FILM_ID_DTYPES
+from log.metrics import metrics
+from storage import save_dataset
+from scraper.utils.js import run_script, BOX_OFFICE_SCRIPT
+from constants import RELEASES_WORKERS, RELEASES_BACKEND, JS_EXTRACTION
+
+BOX_OFFICE_NAME = "Box Office USA"
+
+# Only the movie information of the page of a film is waited for and parsed
+FILM_SCOPE = scope(classes=('card-producer',), names=('dl',))
+FILM_LOCATOR = (By.CSS_SELECTOR, '.card-producer, dt')
+
+
+@metrics.timed('extract')
+def get_box_office_table(document: Document) -> tuple[list[str], list[list[str]], list[str | None]]:
     """
-    This function extract the title, gross, genre and weeks of the box office
+    This function extract the header and the rows of the box office USA table
 
-    @param driver: Driver of the webpage of box office
-    @return: A Dataframe containing the title, gross, genre and weeks of the box office
+    @param document: Document of the webpage of box office
+    @return: The names of the columns, the text of the cells of every row and the url of the film of every row
     """
     box_office_usa = None
     try:
-        html_content = driver.page_source
-        soup = BeautifulSoup(html_content, 'html.parser')
-
         # Get box office USA
-        box_office_name = "Box Office USA"
-        box_office_header = soup.find_all(class_="header")
+        box_office_header = document.find_all(class_="header")
         for item in box_office_header:
-            if item.text.strip().startswith(box_office_name):
+            if item.text.strip().startswith(BOX_OFFICE_NAME):
                 box_office_usa = item.parent
                 break
 
@@ -49,23 +55,53 @@ def get_final_df_box(driver) -> pd.DataFrame:
     for item in thead.find_all('th'):
         df_columns.append(item.text)
 
-    df_box_office = pd.DataFrame(columns=df_columns)
+    table_rows = list()
+    table_urls = list()
     for row in tbody.find_all('tr'):
-        items = row.find_all('td')
-        if len(items) != len(df_columns):
-            logger.error("There are more elements in the row than in the table's header")
-
         item_list = list()
-        for item in items:
+        for item in row.find_all('td'):
             item_list.append(item.text)
+        table_rows.append(item_list)
+
+        # The title of the film links to its page
+        link = row.find('a', href=True)
+        table_urls.append(link['href'] if link else None)
+
+    return df_columns, table_rows, table_urls
+
+
+def get_final_df_box(driver) -> pd.DataFrame:
+    """
+    This function extract the title, gross, genre and weeks of the box office
+
+    @param driver: Driver of the webpage of box office
+    @return: A Dataframe containing the title, gross, genre and weeks of the box office
+    """
+    if JS_EXTRACTION:
+        # Only the cells of the table are sent back from the browser
+        table = run_script(driver, BOX_OFFICE_SCRIPT, 'box office', BOX_OFFICE_NAME)
+        if not table:
+            raise Exception('Could not get into the box office USA')
+        if table['columns'] is None:
+            raise Exception('Could not get the header or body of the table')
+        df_columns, table_rows, table_urls = table['columns'], table['rows'], table['urls']
+    else:
+        df_columns, table_rows, table_urls = get_box_office_table(Document.from_driver(driver))
+
+    rows = RowBuilder(df_columns + ['Film_id'], FILM_ID_DTYPES)
+    for item_list, movie_url in zip(table_rows, table_urls):
+        if len(item_list) != len(df_columns):
+            logger.error("There are more elements in the row than in the table's header")
 
         # Add new row to the df
         new_row = dict(zip(df_columns, item_list))
-        df_box_office.loc[len(df_box_office)] = new_row
+        new_row['Film_id'] = film_id(movie_url)
+        rows.append(new_row)
 
-    return df_box_office
+    return rows.to_df()
 
 
+@metrics.timed('navigation')
 def get_box_office_page(driver) -> None:
     """
     This function gets into the box office page
@@ -85,37 +121,45 @@ def get_box_office_page(driver) -> None:
 
         # Scroll to see the box office button
         fa_rankings.location_once_scrolled_into_view
-        time.sleep(1)
+        pause(1)
         boxWeb.click()
     except Exception as e:
         logger.error(f"Could not get into the box office webpage:  {e}")
         raise Exception(e)
 
 
-def get_data(driver) -> tuple[str, str]:
+def get_producers(text: str) -> list[str]:
+    """
+    Split the text of the producers of a film, the distributor is written after them
+
+    @param text: Text of the producers of the webpage of a film
+    @return: List of producers
+    """
+    return text.split('Distributor')[0].strip().replace('.', '').split(', ')
+
+
+def get_data(document: Document) -> tuple[list[str], str]:
     """
     This function extract the producers and time of a given film.
 
-    @param driver: Driver of the webpage of a film
+    @param document: Document of the webpage of a film
     @return: the producers and the time of the movie
     """
     producers = None
     duration = None
-    try:
-        html_content = driver.page_source
-        soup = BeautifulSoup(html_content, 'html.parser')  # Get all the names and url of the movies
 
+    try:
         # Get producers
-        producers = soup.find(class_="card-producer").text
+        producers = get_producers(document.find(class_="card-producer").text)
 
     except Exception as e:
         logger.error(f"Could not extract the producers {e}")
 
     try:
         # Get duration
-        dt_duration = driver.find_element(By.XPATH, "//dt[contains(text(), 'Running time')]")
-        dd_duration = dt_duration.find_element(By.XPATH, "following-sibling::dd")
-        duration = dd_duration.text
+        dt_duration = document.find('dt', string=lambda text: text and 'Running time' in text)
+        dd_duration = dt_duration.find_next_sibling('dd')
+        duration = dd_duration.text.strip()
 
     except Exception as e:
         logger.error(f"Could not extract the time {e}")
@@ -124,29 +168,30 @@ def get_data(driver) -> tuple[str, str]:
         return producers, duration
 
 
-def get_final_df(driver, title_list) -> pd.DataFrame:
+def get_final_df(driver, title_list, n_workers: int = RELEASES_WORKERS, backend: str = RELEASES_BACKEND,
+                 journal: Journal = None) -> pd.DataFrame:
     """
     Extract the information of every movie from their own page
 
     @param driver: Driver of the new releases
     @param title_list: List containing the title and url of each movie
+    @param n_workers: Number of pages of the movies downloaded at the same time
+    @param backend: Backend used to download the pages (SELENIUM_BACKEND, HTTP_BACKEND or ASYNC_BACKEND)
+    @param journal: Journal used to resume a crashed run
     @return: A Pandas Dataframe that contains the title, the producers and the duration of new releases
     """
-    df = pd.DataFrame(columns=['Title', 'Producers', 'Duration'])
-    for movie_title, movie_url in title_list:
-        try:
-            driver.get(movie_url)
-            time.sleep(0.5)
-            producers, duration = get_data(driver)
-            # Get movie data
-            new_row = {'Title': movie_title,
-                       'Producers': producers,
-                       'Duration': duration}
-            df.loc[len(df)] = new_row
-        except Exception as e:
-            logger.error(f'Error extracting data from the film {movie_title.upper()}: {e}')
+    rows = RowBuilder(['Title', 'Producers', 'Duration', 'Film_id'], FILM_ID_DTYPES)
+    films = crawl_pages(driver, title_list, get_data, n_workers, backend, journal, parse_only=FILM_SCOPE,
+                        locator=FILM_LOCATOR)
+    for movie_title, movie_url, (producers, duration) in films:
+        # Get movie data
+        new_row = {'Title': movie_title,
+                   'Producers': producers,
+                   'Duration': duration,
+                   'Film_id': film_id(movie_url)}
+        rows.append(new_row)
 
-    return df
+    return rows.to_df()
 
 
 def get_urls(driver) -> list[tuple[str, str]]:
@@ -157,11 +202,10 @@ def get_urls(driver) -> list[tuple[str, str]]:
     @return: a list of tuples where the left side is the movie name, and the right side is the url
     """
     # Get all the names and url of the movies
-    html_content = driver.page_source
-    soup = BeautifulSoup(html_content, 'html.parser')
+    document = Document.from_driver(driver, scope(classes=('movie-title',)))
 
     # get all the movie titles
-    release_movies_html = soup.find_all(class_="movie-title")
+    release_movies_html = document.find_all(class_="movie-title")
 
     if not release_movies_html:
         logger.error("Could not get the information of the url from the html")
@@ -187,6 +231,7 @@ def get_urls(driver) -> list[tuple[str, str]]:
     return title_list
 
 
+@metrics.timed('navigation')
 def get_releases_page(driver) -> None:
     """
     This function gets into the new releases
@@ -194,17 +239,6 @@ def get_releases_page(driver) -> None:
     @param driver: Driver of the main page
     @return: None
     """
-    try:
-        # Disagree cookies filmaffinity
-        text_to_find = "DISAGREE"
-        configCookies = driver.find_element(By.XPATH, f"//*[contains(text(), '{text_to_find}')]")
-        configCookies.click()
-    except Exception as e:
-        logger.error(f"Cookies could not been rejected: {e}")
-        raise Exception(e)
-
-    time.sleep(3)
-
     try:
         # Go to the releases page
         page_find = "US releases"
@@ -218,38 +252,35 @@ def get_releases_page(driver) -> None:
         raise Exception(e)
 
 
-def start_scrapper() -> None:
+def start_scrapper(session: BrowserSession = None) -> None:
     """
     Web scraper for the releases and the box office
 
+    @param session: Browser session shared with the other scrapers, a new browser is used if it is not given
     @return:
     """
-    # Add options and initialize the webdriver
-    options = webdriver.FirefoxOptions()
-    options.add_argument("--disable-cookies")
-    driver = webdriver.Firefox(options=options)
-
-    # Get into the main webpage
-    driver.get("https://www.filmaffinity.com/us/main.html")
-    time.sleep(3)
+    with use_session(session) as session:
+        # Get into the main webpage
+        driver = session.open_main_page()
 
-    # Go into releases page
-    get_releases_page(driver)
-    time.sleep(3)
+        # Go into releases page
+        get_releases_page(driver)
+        pause(3)
 
-    # Scroll to the bottom and get all the URL
-    title_list = get_urls(driver)
+        # Scroll to the bottom and get all the URL
+        title_list = get_urls(driver)
 
-    # Get and save the data from the releases
-    df = get_final_df(driver, title_list)
-    df.to_csv(os.path.join(DATA_PATH, 'releases.csv'), index=False)
+        # Get and save the data from the releases, the journal keeps them in case the run crashes
+        journal = Journal('releases')
+        df = get_final_df(driver, title_list, journal=journal)
+        save_dataset(df, 'releases')
+        journal.clear()
 
-    # Get the box office
-    get_box_office_page(driver)
+        # Get the box office
+        get_box_office_page(driver)
 
-    # Get and save the data from the box office
-    df_box = get_final_df_box(driver)
-    df_box.to_csv(os.path.join(DATA_PATH, 'box_office.csv'), index=False)
+        # Get and save the data from the box office
+        df_box = get_final_df_box(driver)
+        save_dataset(df_box, 'box_office')
 
-    driver.quit()
     logger.info("Everything worked fine for the new releases scraper")
@@ -1,50 +1,61 @@
-import os
-import time
+from datetime import datetime, timedelta
 
 from scraper import logger
 import pandas as pd
 
-from bs4 import BeautifulSoup
-
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from constants import DATA_PATH
-
-
-def get_data(driver) -> tuple[list[str], list[str], list[str]]:
+from scraper.utils.driver import BrowserSession, use_session, pause
+from scraper.utils.pool import crawl_pages
+from scraper.utils.cache import html_cache
+from scraper.utils.archive import page_archive
+from scraper.utils.registry import film_id, FILM_ID_DTYPES
+from log.metrics import metrics
+from storage import save_dataset, load_dataset, dataset_exists
+from scraper.utils.journal import Journal
+from scraper.utils.document import Document, scope
+from scraper.utils.rows import RowBuilder
+from scraper.utils.js import run_script, TOP_TITLES_SCRIPT, LOAD_ALL_SCRIPT
+from constants import TOP_FILMS_WORKERS, TOP_FILMS_BACKEND, LISTING_PAGE, TOP_FILMS_INCREMENTAL, \
+    TOP_FILMS_REFRESH_DAYS, JS_EXTRACTION, JS_LOAD_ALL, TOP_FILMS_TARGET, LOAD_ALL_TIMEOUT, SHOW_MORE_STALL
+
+TOP_FILMS_COLUMNS = ['Title', 'Directors', 'genres', 'Actors', 'Url', 'Film_id', 'Updated']
+
+# Only the movie information of the page of a film is waited for and parsed
+FILM_SCOPE = scope(classes=('directors', 'card-genres', 'card-cast-debug', 'card-cast'), names=('dl',))
+FILM_LOCATOR = (By.CSS_SELECTOR, '.directors, .card-genres')
+
+
+def get_data(document: Document) -> tuple[list[str], list[str], list[str]]:
     """
     This function extract the director, the genres and the actor of a given film.
 
-    @param driver: Driver of the webpage of a film
+    @param document: Document of the webpage of a film
     @return: three lists, the directors, the genres and the actors.
     """
-    html_content = driver.page_source
-    soup = BeautifulSoup(html_content, 'html.parser')  # Get all the names and url of the movies
-
     # Get directors
-    directors = soup.find(class_="directors")
+    directors = document.find(class_="directors")
     directors_list = list()
     if directors:
         for director in directors.find_all('a'):
             directors_list.append(director.text)
 
     # Get genres
-    genres = soup.find(class_="card-genres")
+    genres = document.find(class_="card-genres")
     genres_list = list()
     if genres:
         for genre in genres.find_all('a'):
             genres_list.append(genre.text)
 
     # Get actors
-    actors = soup.find(class_="card-cast-debug")
+    actors = document.find(class_="card-cast-debug")
     actors_list = list()
     if actors:
         for actor in actors.find_all('a'):
             actors_list.append(actor.text)
     else:
-        actors = soup.find(class_="card-cast")
+        actors = document.find(class_="card-cast")
         if actors:
             for actor in actors.find_all('a'):
                 actors_list.append(actor.text)
@@ -57,42 +68,101 @@ def get_data(driver) -> tuple[list[str], list[str], list[str]]:
     return directors_list, genres_list, actors_list
 
 
-def get_final_df(driver, title_list) -> pd.DataFrame:
+def get_final_df(driver, title_list, n_workers: int = TOP_FILMS_WORKERS, backend: str = TOP_FILMS_BACKEND,
+                 journal: Journal = None) -> pd.DataFrame:
     """
     Extract the information of every movie from their own page
 
     @param driver: Driver of the top 1000 FA
     @param title_list: List containing the title and url of each movie
+    @param n_workers: Number of pages of the movies downloaded at the same time
+    @param backend: Backend used to download the pages (SELENIUM_BACKEND, HTTP_BACKEND or ASYNC_BACKEND)
+    @param journal: Journal used to resume a crashed run
     @return: A Pandas Dataframe that contains the title, the directors, the genres and the actors of all 1000 movies
     """
-    df = pd.DataFrame(columns=['Title', 'Directors', 'genres', 'Actors'])
-    for movie_title, movie_url in title_list:
-        try:
-            driver.get(movie_url)
-            time.sleep(0.5)
-            directors_list, genres_list, actors_list = get_data(driver)
-            # Get movie data
-            new_row = {'Title': movie_title,
-                       'Directors': str(directors_list)[1:-1].replace('\'', ''),
-                       'genres': str(genres_list)[1:-1].replace('\'', ''),
-                       'Actors': str(actors_list)[1:-1].replace('\'', '')}
-            df.loc[len(df)] = new_row
-        except Exception as e:
-            logger.error(f'Error extracting data from the film {movie_title.upper()}: {e}')
+    rows = RowBuilder(TOP_FILMS_COLUMNS, FILM_ID_DTYPES)
+    updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    films = crawl_pages(driver, title_list, get_data, n_workers, backend, journal, parse_only=FILM_SCOPE,
+                        locator=FILM_LOCATOR)
+    for movie_title, movie_url, (directors_list, genres_list, actors_list) in films:
+        # Get movie data
+        new_row = {'Title': movie_title,
+                   'Directors': directors_list,
+                   'genres': genres_list,
+                   'Actors': actors_list,
+                   'Url': movie_url,
+                   'Film_id': film_id(movie_url),
+                   'Updated': updated}
+        rows.append(new_row)
+
+    return rows.to_df()
+
+
+def get_incremental_df(driver, title_list, refresh_days: int = TOP_FILMS_REFRESH_DAYS,
+                       journal: Journal = None) -> pd.DataFrame:
+    """
+    Extract only the movies that are new in the ranking or whose saved data is older than the refresh window,
+    the rest of the movies are taken from the saved top_films dataset
 
-    return df
+    @param driver: Driver of the top 1000 FA
+    @param title_list: List containing the title and url of each movie
+    @param refresh_days: Number of days after which the data of a movie is extracted again
+    @param journal: Journal used to resume a crashed run
+    @return: A Pandas Dataframe with the same content as get_final_df, in the order of the ranking
+    """
+    if not dataset_exists('top_films'):
+        return get_final_df(driver, title_list, journal=journal)
 
+    df_saved = load_dataset('top_films')
+    if 'Url' not in df_saved.columns or 'Updated' not in df_saved.columns:
+        logger.info("The saved top films have no url or date, all the films are extracted again")
+        return get_final_df(driver, title_list, journal=journal)
 
-def get_urls(driver) -> list[tuple[str, str]]:
+    # keep only the movies extracted inside the refresh window
+    df_saved = df_saved.dropna(subset=['Url']).drop_duplicates(subset=['Url'], keep='last')
+    limit = datetime.now() - timedelta(days=refresh_days)
+    df_saved['Film_id'] = df_saved['Url'].map(film_id).astype(FILM_ID_DTYPES['Film_id'])
+    df_saved = df_saved[pd.to_datetime(df_saved['Updated'], errors='coerce') >= limit]
+
+    saved_urls = set(df_saved['Url'])
+    new_title_list = [(movie_title, movie_url) for movie_title, movie_url in title_list
+                      if movie_url not in saved_urls]
+    logger.info(f"{len(new_title_list)} of {len(title_list)} films are new or older than {refresh_days} days")
+
+    df_new = get_final_df(driver, new_title_list, journal=journal)
+
+    # put together the saved and new movies in the order of the ranking
+    df = pd.concat([df_saved, df_new], ignore_index=True).drop_duplicates(subset=['Url'], keep='last')
+    df = df.set_index('Url')
+    ranking = [movie_url for _, movie_url in title_list if movie_url in df.index]
+    df = df.loc[ranking].reset_index()
+
+    return df[TOP_FILMS_COLUMNS]
+
+
+@metrics.timed('show_all_films')
+def show_all_films(driver, target: int = TOP_FILMS_TARGET) -> None:
     """
-    Obtain all names and urls of the 1000 films from the top 1000 FA
+    Click the "show-more" button of the top 1000 FA until all the films are in the page
 
     @param driver: Driver of the top 1000 FA
-    @return: a list of tuples where the left side is the movie name, and the right side is the url
+    @param target: Number of films to load, 0 to load all of them
+    @return: None
     """
+    if JS_LOAD_ALL:
+        # a single script clicks the button and waits for the new films inside the browser
+        try:
+            driver.set_script_timeout(LOAD_ALL_TIMEOUT)
+            n_films = run_script(driver, LOAD_ALL_SCRIPT, 'show-more', target, SHOW_MORE_STALL * 1000,
+                                 asynchronous=True)
+            logger.info(f"There are {n_films} films loaded in the top 1000 FA")
+            return
+        except Exception as e:
+            logger.error(f"Could not load all the films with a single script, clicking from python: {e}")
+
     while True:
         try:
-            time.sleep(1)
+            pause(1)
 
             # Wait until the show-more button is visible
             driver.find_element(By.CLASS_NAME, "show-more")
@@ -104,19 +174,53 @@ def get_urls(driver) -> list[tuple[str, str]]:
             if not show_more_button.is_displayed():
                 break
             show_more_button.location_once_scrolled_into_view
-            time.sleep(0.5)
+            pause(0.5)
             show_more_button.click()
         except Exception as e:
             # If the button is not found, then we extract the information of the movies
             logger.info(f"There is no more 'show-more' button: {e}")
             break
 
-    # Get all the names and url of the movies
-    html_content = driver.page_source
-    soup = BeautifulSoup(html_content, 'html.parser')
+
+def get_urls(driver) -> list[tuple[str, str]]:
+    """
+    Obtain all names and urls of the 1000 films from the top 1000 FA
+
+    @param driver: Driver of the top 1000 FA
+    @return: a list of tuples where the left side is the movie name, and the right side is the url
+    """
+    # Reuse the expanded list if it was cached recently, clicking "show-more" takes several minutes
+    listing_url = driver.current_url
+    html_content = html_cache.get(listing_url, LISTING_PAGE)
+    if html_content is None:
+        show_all_films(driver)
+
+        # Get all the names and url of the movies inside the browser (the list is not cached in this mode)
+        if JS_EXTRACTION:
+            title_list = [tuple(film) for film in run_script(driver, TOP_TITLES_SCRIPT, 'top films urls')]
+            if not title_list:
+                logger.error("Could not get the information of the url from the html")
+            return title_list
+
+        # Get all the names and url of the movies
+        html_content = driver.page_source
+        html_cache.put(listing_url, html_content)
+
+    return get_title_list(html_content)
+
+
+@metrics.timed('extract')
+def get_title_list(html_content: str) -> list[tuple[str, str]]:
+    """
+    Obtain the names and urls of the films of the html of the top 1000 FA
+
+    @param html_content: Html of the top 1000 FA with all the films loaded
+    @return: a list of tuples where the left side is the movie name, and the right side is the url
+    """
+    document = Document(html_content, scope(classes=('mc-title',)))
 
     # get all the movie titles
-    top_movies_html = soup.find_all(class_="mc-title")
+    top_movies_html = document.find_all(class_="mc-title")
 
     if not top_movies_html:
         logger.error("Could not get the information of the url from the html")
@@ -141,6 +245,7 @@ def get_urls(driver) -> list[tuple[str, str]]:
     return title_list
 
 
+@metrics.timed('navigation')
 def get_top_page(driver) -> None:
     """
     This function gets into the top 1000 FA page
@@ -148,17 +253,6 @@ def get_top_page(driver) -> None:
     @param driver: Driver of the main page
     @return: None
     """
-    try:
-        # Disagree cookies filmaffinity
-        text_to_find = "DISAGREE"
-        configCookies = driver.find_element(By.XPATH, f"//*[contains(text(), '{text_to_find}')]")
-        configCookies.click()
-    except Exception as e:
-        logger.error(f"Cookies could not been rejected: {e}")
-        raise Exception("Cookies could not been rejected:")
-
-    time.sleep(3)
-
     try:
         # Go to the top 1000 films
         page_find = "Top 1000 FA"
@@ -170,39 +264,39 @@ def get_top_page(driver) -> None:
 
         # Scroll to see the Top 1000 FA ranking
         fa_rankings.location_once_scrolled_into_view
-        time.sleep(1)
+        pause(1)
         topWeb.click()
     except Exception as e:
         logger.error(f"Could not get into the top webpage:  {e}")
         raise Exception("Could not get into the top webpage")
 
 
-def start_scrapper() -> None:
+def start_scrapper(session: BrowserSession = None) -> None:
     """
     Web scraper for the top 1000 FA
 
-        @return:
+    @param session: Browser session shared with the other scrapers, a new browser is used if it is not given
+    @return:
     """
-    # Add options and initialize the webdriver
-    options = webdriver.FirefoxOptions()
-    options.add_argument("--disable-cookies")
-    driver = webdriver.Firefox(options=options)
-
-    # Get into the main webpage
-    driver.get("https://www.filmaffinity.com/us/main.html")
-    time.sleep(3)
-
-    # Go into the top 1000 FA
-    get_top_page(driver)
-    time.sleep(3)
-
-    # Scroll to the bottom and get all the URL
-    title_list = get_urls(driver)
-
-    # Get and save the data containing the films
-    df = get_final_df(driver, title_list)
-    df.to_csv(os.path.join(DATA_PATH, 'top_films.csv'), index=False)
-
-    driver.quit()
+    with use_session(session) as session:
+        # Get into the main webpage
+        driver = session.open_main_page()
+
+        # Go into the top 1000 FA
+        get_top_page(driver)
+        pause(3)
+
+        # Scroll to the bottom and get all the URL
+        title_list = get_urls(driver)
+
+        # Get and save the data containing the films, the journal keeps them in case the run crashes
+        journal = Journal('top_films')
+        # a recorded run has to download every film to be replayed
+        if TOP_FILMS_INCREMENTAL and not page_archive.mode:
+            df = get_incremental_df(driver, title_list, journal=journal)
+        else:
+            df = get_final_df(driver, title_list, journal=journal)
+        save_dataset(df, 'top_films')
+        journal.clear()
 
     logger.info("Everything worked fine for the new top films scraper")
@@ -0,0 +1,326 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.remote.webelement import WebElement
+
+from scraper import logger
+from constants import ARCHIVE_MODE, ARCHIVE_PATH, RECORD_MODE, REPLAY_MODE
+
+
+class ReplayError(Exception):
+    """
+    The scrapers asked for something that is not in the archive
+    """
+
+
+def _script_key(script: str) -> str:
+    # the scripts are long, they are identified by their hash
+    return hashlib.sha1(script.encode('utf-8')).hexdigest()[:12]
+
+
+class PageArchive(object):
+    def __init__(self, path: str = ARCHIVE_PATH, mode: str = ARCHIVE_MODE):
+        """
+        Single compressed archive (json lines in gzip) with every page read by the scrapers. It has two parts:
+        the film pages, addressed by their url, and the calls to the browser of the session in the order they were
+        made (page_source, current_url, scripts and element lookups)
+
+        @param path: Path of the archive
+        @param mode: RECORD_MODE to save the pages of a normal run, REPLAY_MODE to run from the archive without
+                     network nor browser, None to do nothing
+        """
+        self.path = path
+        self.mode = mode
+        self._file = None
+        self._pages = dict()
+        self._calls = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def recording(self) -> bool:
+        return self.mode == RECORD_MODE
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == REPLAY_MODE
+
+    def open(self) -> None:
+        """
+        Start a new archive when recording or load it when replaying
+
+        @return: None
+        """
+        if self.recording:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = gzip.open(self.path, 'wt', encoding='utf-8')
+            self._write({'type': 'header', 'created': datetime.now().isoformat()})
+            logger.info(f"Recording the pages in {self.path}")
+        elif self.replaying:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as file:
+                for line in file:
+                    record = json.loads(line)
+                    if record['type'] == 'page':
+                        self._pages[record['url']] = record['html']
+                    elif record['type'] == 'call':
+                        self._calls.append(record)
+            logger.info(f"Replaying {len(self._pages)} pages and {len(self._calls)} browser calls from {self.path}")
+
+    def close(self) -> None:
+        """
+        Close the archive, the calls left when replaying mean that the run differs from the recorded one
+
+        @return: None
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.replaying and self._calls:
+            logger.warning(f"{len(self._calls)} recorded browser calls were not replayed")
+
+    def _write(self, record: dict) -> None:
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + '\n')
+
+    def record_page(self, url: str, html: str) -> None:
+        """
+        Save the html of a film page
+
+        @param url: Url of the page
+        @param html: Html of the page as it was extracted
+        @return: None
+        """
+        self._write({'type': 'page', 'url': url, 'html': html, 'fetched_at': datetime.now().isoformat()})
+
+    def page(self, url: str) -> str:
+        """
+        Html of a film page, it has the same signature as the fetch functions of the crawler
+
+        @param url: Url of the page
+        @return: The html of the page
+        """
+        try:
+            return self._pages[url]
+        except KeyError:
+            raise ReplayError(f"The page {url} is not in the archive")
+
+    def record_call(self, call: str, args: list, value=None, error: str = None, url: str = None) -> None:
+        """
+        Save a call to the browser of the session
+
+        @param call: Name of the call
+        @param args: Arguments that identify the call
+        @param value: Returned value, it must be serializable as json
+        @param error: Message of the exception if the call failed
+        @param url: Url of the page where the call was made
+        @return: None
+        """
+        self._write({'type': 'call', 'call': call, 'args': args, 'value': value, 'error': error, 'url': url,
+                     'at': datetime.now().isoformat()})
+
+    def peek_call(self, call: str, args: list) -> dict | None:
+        """
+        Next recorded call if it is the given one
+
+        @param call: Name of the call
+        @param args: Arguments that identify the call
+        @return: The record of the call or None if the next call is a different one
+        """
+        if self._calls and self._calls[0]['call'] == call and self._calls[0]['args'] == args:
+            return self._calls[0]
+        return None
+
+    def next_call(self, call: str, args: list):
+        """
+        Consume the next recorded call, it must be the given one
+
+        @param call: Name of the call
+        @param args: Arguments that identify the call
+        @return: The value returned by the call when it was recorded
+        """
+        record = self.peek_call(call, args)
+        if record is None:
+            expected = self._calls[0]['call'] if self._calls else 'the end of the archive'
+            raise ReplayError(f"The run differs from the recorded one: {call} called but {expected} was recorded")
+
+        self._calls.popleft()
+        if record['error'] is not None:
+            raise Exception(record['error'])
+        return record['value']
+
+    def skip_failed_calls(self, call: str, args: list) -> bool:
+        """
+        Consume the consecutive failed records of the same call, and the successful one that follows them if any
+
+        @param call: Name of the call
+        @param args: Arguments that identify the call
+        @return: True if the call finally succeeded when it was recorded
+        """
+        record = self.peek_call(call, args)
+        while record is not None and record['error'] is not None:
+            self._calls.popleft()
+            record = self.peek_call(call, args)
+        if record is None:
+            return False
+        self._calls.popleft()
+        return True
+
+    def wrap(self, driver):
+        """
+        Driver of the browser session for the current mode
+
+        @param driver: Real driver, None when replaying
+        @return: The real driver, a driver that records its calls or a driver that replays them
+        """
+        if self.recording:
+            return RecordingDriver(driver, self)
+        if self.replaying:
+            return ReplayDriver(self)
+        return driver
+
+
+def unwrap(driver):
+    """
+    Real driver of a session driver. The film pages are saved with record_page, so loading them with the recording
+    driver would also save their calls, that are not consumed when the pages are replayed
+
+    @param driver: Driver of the browser session
+    @return: The real driver when recording, the given one otherwise
+    """
+    return driver._driver if isinstance(driver, RecordingDriver) else driver
+
+
+class RecordingDriver(object):
+    """
+    Driver that saves in the archive everything the scrapers read from the browser, the rest of the calls go
+    directly to the real driver
+    """
+
+    def __init__(self, driver, archive: PageArchive):
+        self._driver = driver
+        self._archive = archive
+
+    def __getattr__(self, name: str):
+        return getattr(self._driver, name)
+
+    def _record(self, call: str, args: list, function):
+        url = self._driver.current_url
+        try:
+            value = function()
+        except Exception as e:
+            self._archive.record_call(call, args, error=str(e), url=url)
+            raise
+        self._archive.record_call(call, args, value if call != 'find_element' else True, url=url)
+        return value
+
+    @property
+    def page_source(self) -> str:
+        return self._record('page_source', [], lambda: self._driver.page_source)
+
+    @property
+    def current_url(self) -> str:
+        return self._record('current_url', [], lambda: self._driver.current_url)
+
+    def execute_script(self, script: str, *args):
+        return self._record('execute_script', [_script_key(script), *args],
+                            lambda: self._driver.execute_script(script, *args))
+
+    def execute_async_script(self, script: str, *args):
+        return self._record('execute_async_script', [_script_key(script), *args],
+                            lambda: self._driver.execute_async_script(script, *args))
+
+    def find_element(self, by: str, value: str):
+        return self._record('find_element', [by, value], lambda: self._driver.find_element(by, value))
+
+
+class ReplayElement(WebElement):
+    """
+    Element of a replayed page: it is always displayed and becomes stale once something is clicked
+    """
+
+    def __init__(self, driver: 'ReplayDriver'):
+        super().__init__(driver, f'replay-{driver.clicks}')
+        self._clicks = driver.clicks
+
+    def click(self) -> None:
+        self._parent.clicks += 1
+
+    def is_displayed(self) -> bool:
+        return True
+
+    def is_enabled(self) -> bool:
+        if self._parent.clicks != self._clicks:
+            raise StaleElementReferenceException("The page changed after a click")
+        return True
+
+    @property
+    def location_once_scrolled_into_view(self) -> dict:
+        return {'x': 0, 'y': 0}
+
+
+class _ReplaySwitchTo(object):
+    def __init__(self, driver: 'ReplayDriver'):
+        self._driver = driver
+
+    def window(self, handle: str) -> None:
+        self._driver.current_window_handle = handle
+
+    def new_window(self, type_hint: str = None) -> None:
+        self._driver.n_windows += 1
+        self._driver.current_window_handle = f'replay-window-{self._driver.n_windows}'
+
+
+class ReplayDriver(object):
+    """
+    Stand-in for the browser that returns the recorded values in the same order they were read, there is no
+    browser nor network
+    """
+
+    def __init__(self, archive: PageArchive):
+        self._archive = archive
+        self.clicks = 0
+        self.n_windows = 0
+        self.current_window_handle = 'replay-window-0'
+        self.switch_to = _ReplaySwitchTo(self)
+
+    @property
+    def page_source(self) -> str:
+        return self._archive.next_call('page_source', [])
+
+    @property
+    def current_url(self) -> str:
+        return self._archive.next_call('current_url', [])
+
+    def execute_script(self, script: str, *args):
+        return self._archive.next_call('execute_script', [_script_key(script), *args])
+
+    def execute_async_script(self, script: str, *args):
+        return self._archive.next_call('execute_async_script', [_script_key(script), *args])
+
+    def find_element(self, by: str, value: str) -> ReplayElement:
+        # the failed lookups of a wait that ended finding the element are not repeated, and a lookup that was not
+        # recorded (the element was not looked for again) fails as it did when it was recorded
+        if not self._archive.skip_failed_calls('find_element', [by, value]):
+            raise NoSuchElementException(f"{value} was not found when the run was recorded")
+        return ReplayElement(self)
+
+    def get(self, url: str) -> None:
+        pass
+
+    def set_script_timeout(self, time_to_wait: float) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def quit(self) -> None:
+        pass
+
+
+page_archive = PageArchive()
@@ -0,0 +1,8 @@
+// the scripts of filmaffinity (and its subdomains) are needed by the listings, the rest are ads and trackers
+const FIRST_PARTY = /(^|\.)filmaffinity\.com$/;
+
+browser.webRequest.onBeforeRequest.addListener(
+  (details) => ({cancel: !FIRST_PARTY.test(new URL(details.url).hostname)}),
+  {urls: ['<all_urls>'], types: ['script']},
+  ['blocking']
+);
@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from typing import Callable
+
+from scraper import logger
+from constants import CACHE_PATH, CACHE_ENABLED, CACHE_MAX_SIZE, CACHE_TTL, LOCALE, DETAIL_PAGE
+
+
+class HtmlCache(object):
+    def __init__(self, path: str = CACHE_PATH, max_size: int = CACHE_MAX_SIZE, ttl: dict = None,
+                 locale: str = LOCALE, enabled: bool = CACHE_ENABLED):
+        """
+        On-disk cache of compressed html pages, addressed by the hash of the url and the locale
+
+        The modification time of a file is when the page was downloaded (used for the TTL) and the access time is
+        when it was last read (used for the LRU eviction)
+
+        @param path: Folder where the pages are saved
+        @param max_size: Maximum size in bytes of the cache, the least recently used pages are removed above it
+        @param ttl: Seconds that a page is valid for every page type
+        @param locale: Locale of the pages, part of the key
+        @param enabled: If False the cache never returns or saves pages
+        """
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl or CACHE_TTL
+        self.locale = locale
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = None  # key -> [size, last access], loaded the first time it is needed
+        self._size = 0
+
+    def _key(self, url: str) -> str:
+        return hashlib.sha256(f"{self.locale}|{url}".encode('utf-8')).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.html.gz")
+
+    def _load_entries(self) -> None:
+        """
+        Scan the cache folder to know the size and last access of every page
+
+        @return: None
+        """
+        os.makedirs(self.path, exist_ok=True)
+        self._entries = dict()
+        self._size = 0
+        for file in os.scandir(self.path):
+            if file.name.endswith('.html.gz'):
+                stat = file.stat()
+                self._entries[file.name[:-len('.html.gz')]] = [stat.st_size, stat.st_atime]
+                self._size += stat.st_size
+
+    def get(self, url: str, page_type: str = DETAIL_PAGE) -> str | None:
+        """
+        Get a page from the cache if it is there and it has not expired
+
+        @param url: Url of the page
+        @param page_type: Type of page, it defines the TTL
+        @return: The html of the page or None if it is not in the cache
+        """
+        if not self.enabled:
+            return None
+
+        key = self._key(url)
+        file = self._file(key)
+        with self._lock:
+            if self._entries is None:
+                self._load_entries()
+            try:
+                fresh = time.time() - os.path.getmtime(file) <= self.ttl[page_type]
+            except OSError:
+                fresh = False
+
+            if not fresh:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            now = time.time()
+            os.utime(file, (now, os.path.getmtime(file)))
+            if key in self._entries:
+                self._entries[key][1] = now
+
+        try:
+            with gzip.open(file, 'rt', encoding='utf-8') as f:
+                return f.read()
+        except OSError as e:
+            logger.error(f"Could not read {url} from the cache: {e}")
+            return None
+
+    def put(self, url: str, html_content: str) -> None:
+        """
+        Save a page in the cache, removing the least recently used pages if the cache is too big
+
+        @param url: Url of the page
+        @param html_content: Html of the page
+        @return: None
+        """
+        if not self.enabled:
+            return
+
+        key = self._key(url)
+        file = self._file(key)
+        data = gzip.compress(html_content.encode('utf-8'))
+        with self._lock:
+            if self._entries is None:
+                self._load_entries()
+
+            # write to a temporary file so a page is never read half written, unique among the scraper processes
+            tmp_file = f"{file}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_file, file)
+
+            old_size = self._entries.get(key, [0, 0])[0]
+            self._entries[key] = [len(data), time.time()]
+            self._size += len(data) - old_size
+            self._evict()
+
+    def _evict(self) -> None:
+        """
+        Remove the least recently used pages until the cache fits in its maximum size
+
+        @return: None
+        """
+        if self._size <= self.max_size:
+            return
+
+        for key, (size, _) in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self._size <= self.max_size:
+                break
+            try:
+                os.remove(self._file(key))
+            except OSError:
+                pass
+            del self._entries[key]
+            self._size -= size
+
+    def cached(self, fetch: Callable[[str], str], page_type: str = DETAIL_PAGE) -> Callable[[str], str]:
+        """
+        Put the cache in front of a function that downloads pages
+
+        @param fetch: Function that returns the html of a given url
+        @param page_type: Type of the pages downloaded by the function
+        @return: A function that returns the html from the cache or downloads it and saves it
+        """
+        def cached_fetch(url: str) -> str:
+            html_content = self.get(url, page_type)
+            if html_content is None:
+                html_content = fetch(url)
+                self.put(url, html_content)
+            return html_content
+
+        return cached_fetch
+
+    def log_summary(self) -> None:
+        """
+        Log the number of hits and misses of the cache
+
+        @return: None
+        """
+        if not self.enabled:
+            return
+        total = self.hits + self.misses
+        ratio = self.hits / total * 100 if total else 0
+        logger.info(f"HTML cache: {self.hits} hits, {self.misses} misses ({ratio:.1f}% hit ratio), "
+                    f"{len(self._entries or {})} pages using {self._size / 1024 / 1024:.1f} MB")
+
+
+html_cache = HtmlCache()
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from collections import defaultdict
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from scraper import logger
+from scraper.utils.cache import html_cache
+from log.metrics import metrics
+from constants import HTTP_HEADERS, HTTP_TIMEOUT, MAX_REQUESTS_PER_SECOND, MAX_REQUESTS_PER_HOST
+
+
+class TokenBucket(object):
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Rate limit shared by all the requests of a crawl
+
+        @param rate: Number of tokens (requests) added every second
+        @param capacity: Maximum number of tokens that can be saved for a burst
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Wait until a token is available and take it
+
+        @return: None
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def _fetch(session: aiohttp.ClientSession, bucket: TokenBucket, semaphore: asyncio.Semaphore,
+                 url: str, retries: int = 3) -> str:
+    """
+    Download a page respecting the rate limit and the limit of requests of its host
+
+    @param session: Session used to download the page
+    @param bucket: Rate limit of the crawl
+    @param semaphore: Limit of requests in flight for the host of the url
+    @param url: Url of the page
+    @param retries: Number of times a throttled or failed request is retried
+    @return: The html of the page
+    """
+    async with semaphore:
+        for attempt in range(retries + 1):
+            await bucket.acquire()
+            async with session.get(url) as response:
+                if response.status in (429, 500, 502, 503, 504) and attempt < retries:
+                    logger.warning(f"Got status {response.status} from {url}, retrying")
+                    await asyncio.sleep(2 ** attempt)
+                    continue
+                response.raise_for_status()
+                return await response.text()
+
+
+async def _fetch_film(session: aiohttp.ClientSession, bucket: TokenBucket, semaphore: asyncio.Semaphore,
+                      index: int, movie_title: str, movie_url: str) -> tuple[int, str, str | None]:
+    """
+    Download the page of a film without raising, so one failed page does not stop the crawl
+
+    @param session: Session used to download the page
+    @param bucket: Rate limit of the crawl
+    @param semaphore: Limit of requests in flight for the host of the url
+    @param index: Position of the film in the list
+    @param movie_title: Title of the film
+    @param movie_url: Url of the page of the film
+    @return: The index, the title and the html of the page (None if it could not be downloaded)
+    """
+    # pages in the cache do not use the network nor the rate limit
+    html_content = html_cache.get(movie_url)
+    if html_content is not None:
+        return index, movie_title, html_content
+
+    try:
+        with metrics.stage('fetch'):
+            html_content = await _fetch(session, bucket, semaphore, movie_url)
+        html_cache.put(movie_url, html_content)
+        return index, movie_title, html_content
+    except Exception as e:
+        logger.error(f'Error downloading the film {str(movie_title).upper()}: {e}')
+        return index, movie_title, None
+
+
+async def crawl(title_list: list[tuple[str, str]], requests_per_second: float = MAX_REQUESTS_PER_SECOND,
+                max_per_host: int = MAX_REQUESTS_PER_HOST) -> AsyncIterator[tuple[int, str, str]]:
+    """
+    Download the pages of all the films at the same time, yielding every page as soon as it arrives
+
+    @param title_list: List containing the title and url of each movie
+    @param requests_per_second: Maximum number of requests started every second
+    @param max_per_host: Maximum number of requests in flight for the same host
+    @return: An async iterator of tuples with the index in title_list, the title and the html of the page
+    """
+    bucket = TokenBucket(requests_per_second)
+    semaphores = defaultdict(lambda: asyncio.Semaphore(max_per_host))
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT)
+
+    async with aiohttp.ClientSession(headers=HTTP_HEADERS, timeout=timeout) as session:
+        tasks = list()
+        for index, (movie_title, movie_url) in enumerate(title_list):
+            host = urlsplit(movie_url).netloc
+            tasks.append(asyncio.create_task(
+                _fetch_film(session, bucket, semaphores[host], index, movie_title, movie_url)))
+
+        try:
+            for next_page in asyncio.as_completed(tasks):
+                index, movie_title, html_content = await next_page
+                if html_content is not None:
+                    yield index, movie_title, html_content
+        finally:
+            for task in tasks:
+                task.cancel()
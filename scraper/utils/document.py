@@ -0,0 +1,74 @@
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from scraper import logger
+from log.metrics import metrics
+from constants import HTML_PARSER
+
+
+def scope(classes: tuple = (), ids: tuple = (), names: tuple = ()) -> SoupStrainer:
+    """
+    Create a strainer that only parses the subtrees of the page that are read by the extractors
+
+    @param classes: Classes of the elements to keep
+    @param ids: Ids of the elements to keep
+    @param names: Tag names of the elements to keep
+    @return: A SoupStrainer that keeps an element (and all its children) if it matches any of the conditions
+    """
+    classes = set(classes)
+
+    def keep(name: str, attrs: dict) -> bool:
+        # the class is still the raw string while the page is being parsed
+        tag_classes = attrs.get('class') or ''
+        if isinstance(tag_classes, str):
+            tag_classes = tag_classes.split()
+        return name in names or attrs.get('id') in ids or not classes.isdisjoint(tag_classes)
+
+    return SoupStrainer(keep)
+
+
+class Document(object):
+    def __init__(self, html_content: str, parse_only: SoupStrainer = None):
+        """
+        Html of a page that is parsed only once, the first time it is queried
+
+        @param html_content: Html of the page
+        @param parse_only: Strainer to parse only some subtrees of the page, None to parse the whole page
+        """
+        self.html = html_content
+        self.parse_only = parse_only
+        self._soup = None
+
+    @classmethod
+    def from_driver(cls, driver, parse_only: SoupStrainer = None) -> 'Document':
+        """
+        Create a document from the page currently loaded in the browser
+
+        @param driver: Driver of the page
+        @param parse_only: Strainer to parse only some subtrees of the page, None to parse the whole page
+        @return: The document of the page
+        """
+        start = time.perf_counter()
+        html_content = driver.page_source
+        elapsed = time.perf_counter() - start
+        metrics.observe('page_source', elapsed)
+        logger.debug(f"page_source: {len(html_content.encode('utf-8')) / 1024:.1f} KB transferred in "
+                     f"{elapsed * 1000:.0f} ms")
+        return cls(html_content, parse_only)
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            start = time.perf_counter()
+            self._soup = BeautifulSoup(self.html, HTML_PARSER, parse_only=self.parse_only)
+            elapsed = time.perf_counter() - start
+            metrics.observe('parse', elapsed)
+            logger.debug(f"Page parsed in {elapsed * 1000:.0f} ms")
+        return self._soup
+
+    def find(self, *args, **kwargs):
+        return self.soup.find(*args, **kwargs)
+
+    def find_all(self, *args, **kwargs):
+        return self.soup.find_all(*args, **kwargs)
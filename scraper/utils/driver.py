@@ -0,0 +1,260 @@
+import os
+import time
+from contextlib import nullcontext
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from scraper import logger
+from scraper.utils.archive import page_archive, unwrap
+from log.metrics import metrics
+from constants import PAGE_LOAD_DELAY, PAGE_WAIT_TIMEOUT, MAIN_URL, LEAN_BROWSER, LEAN_PROFILE
+
+
+# Extension that cancels the scripts of other domains than filmaffinity, Firefox has no preference to block them
+BLOCK_SCRIPTS_PATH = os.path.join(os.path.dirname(__file__), 'block_scripts')
+
+# Semaphore shared by the processes of the scrapers to limit the number of browsers running at the same time
+_browser_slots = None
+# Browsers started by create_driver, the only ones that hold a slot
+_slot_drivers = set()
+
+
+def set_browser_slots(slots) -> None:
+    """
+    Limit the number of browsers with a semaphore shared by several processes
+
+    @param slots: Semaphore with a slot for every browser allowed, None for no limit
+    @return: None
+    """
+    global _browser_slots
+    _browser_slots = slots
+
+
+def create_driver(lean: bool = LEAN_BROWSER, block: bool = True) -> webdriver.Firefox:
+    """
+    Create a new Firefox webdriver with the options used by all the scrapers
+
+    @param lean: Use the lean profile (LEAN_PROFILE): headless, without images, media, fonts, trackers or third party
+                 scripts and returning from driver.get as soon as the DOM is ready
+    @param block: Wait for a free slot if the maximum number of browsers is running, otherwise raise an exception
+    @return: A new Firefox webdriver
+    """
+    if _browser_slots is not None and not _browser_slots.acquire(block):
+        raise Exception("The maximum number of browsers is already running")
+
+    try:
+        driver = webdriver.Firefox(options=_get_options(lean))
+    except Exception:
+        if _browser_slots is not None:
+            _browser_slots.release()
+        raise
+    _slot_drivers.add(driver)
+
+    if lean and LEAN_PROFILE['block_third_party']:
+        try:
+            driver.install_addon(BLOCK_SCRIPTS_PATH, temporary=True)
+        except Exception:
+            quit_driver(driver)
+            raise
+    return driver
+
+
+def quit_driver(driver) -> None:
+    """
+    Close a browser and free its slot if it was created with create_driver, the drivers of a replay hold no slot
+
+    @param driver: Driver to close, it can be wrapped by the page archive
+    @return: None
+    """
+    driver = unwrap(driver)
+    try:
+        driver.quit()
+    finally:
+        if driver in _slot_drivers:
+            _slot_drivers.discard(driver)
+            if _browser_slots is not None:
+                _browser_slots.release()
+
+
+def _get_options(lean: bool) -> webdriver.FirefoxOptions:
+    """
+    Options of the browsers used by the scrapers
+
+    @param lean: Use the lean profile
+    @return: The options of Firefox
+    """
+    options = webdriver.FirefoxOptions()
+    options.add_argument("--disable-cookies")
+
+    if lean:
+        if LEAN_PROFILE['headless']:
+            options.add_argument("-headless")
+        options.page_load_strategy = LEAN_PROFILE['page_load_strategy']
+        if LEAN_PROFILE['block_images']:
+            options.set_preference('permissions.default.image', 2)
+        if LEAN_PROFILE['block_media']:
+            options.set_preference('media.autoplay.default', 5)
+            options.set_preference('media.autoplay.blocking_policy', 2)
+        if LEAN_PROFILE['block_fonts']:
+            options.set_preference('browser.display.use_document_fonts', 0)
+            options.set_preference('gfx.downloadable_fonts.enabled', False)
+        if LEAN_PROFILE['block_css']:
+            options.set_preference('permissions.default.stylesheet', 2)
+        if LEAN_PROFILE['block_third_party']:
+            # the trackers and their cookies, the rest of the third party scripts are blocked by the extension
+            # installed in create_driver
+            options.set_preference('privacy.trackingprotection.enabled', True)
+            options.set_preference('privacy.trackingprotection.socialtracking.enabled', True)
+            options.set_preference('network.cookie.cookieBehavior', 1)
+
+    return options
+
+
+def wait_for(driver, locator: tuple[str, str], timeout: float = PAGE_WAIT_TIMEOUT) -> bool:
+    """
+    Wait until an element is in the page, needed when driver.get does not wait for the whole page
+
+    @param driver: Driver of the page
+    @param locator: Tuple (By, value) of the element
+    @param timeout: Maximum number of seconds to wait
+    @return: True if the element was found, False otherwise
+    """
+    try:
+        with metrics.stage('wait'):
+            WebDriverWait(driver, timeout).until(EC.presence_of_element_located(locator))
+        return True
+    except TimeoutException:
+        logger.warning(f"The element {locator[1]} was not found in {driver.current_url}")
+        return False
+
+
+def pause(seconds: float) -> None:
+    """
+    Fixed sleep, measured apart from the waits for elements. Nothing is waited when replaying an archive, the pages
+    are already complete
+
+    @param seconds: Seconds to sleep
+    @return: None
+    """
+    if page_archive.replaying:
+        return
+    with metrics.stage('sleep'):
+        time.sleep(seconds)
+
+
+def get_page_source(driver, url: str, locator: tuple[str, str] = None) -> str:
+    """
+    Load a page in the browser and return its html
+
+    @param driver: Driver used to load the page
+    @param url: Url of the page
+    @param locator: Tuple (By, value) of an element needed by the extractor, the page is returned as soon as it is
+                    there. If it is not given a fixed time is waited
+    @return: The html of the page once it is loaded
+    """
+    with metrics.stage('navigation'):
+        driver.get(url)
+    if locator:
+        wait_for(driver, locator)
+    else:
+        pause(PAGE_LOAD_DELAY)
+    return driver.page_source
+
+
+def open_tab(driver, url: str) -> str:
+    """
+    Start loading a page in a new tab without waiting for it, the browser keeps loading it in the background
+
+    @param driver: Driver where the tab is opened, it is switched to the new tab
+    @param url: Url of the page
+    @return: Handle of the new tab
+    """
+    driver.switch_to.new_window('tab')
+    # Unlike driver.get, changing the location returns immediately
+    driver.execute_script("window.location.href = arguments[0];", url)
+    return driver.current_window_handle
+
+
+def reject_cookies(driver) -> None:
+    """
+    Disagree the cookies of filmaffinity, it only has to be done once per browser
+
+    @param driver: Driver of the main page
+    @return: None
+    """
+    try:
+        text_to_find = "DISAGREE"
+        configCookies = driver.find_element(By.XPATH, f"//*[contains(text(), '{text_to_find}')]")
+        configCookies.click()
+    except Exception as e:
+        logger.error(f"Cookies could not been rejected: {e}")
+        raise Exception("Cookies could not been rejected:")
+
+
+class BrowserSession(object):
+    def __init__(self):
+        """
+        Browser shared by all the scrapers of a run, it is started the first time it is needed and the cookies
+        are only rejected once
+        """
+        self.driver = None
+        self.cookies_rejected = False
+
+    def open_main_page(self):
+        """
+        Go to the main page of filmaffinity, starting the browser and rejecting the cookies if needed
+
+        @return: The driver of the main page
+        """
+        if self.driver is None and page_archive.replaying:
+            self.driver = page_archive.wrap(None)
+        elif self.driver is None:
+            logger.info("Starting the browser")
+            self.driver = page_archive.wrap(create_driver())
+
+        with metrics.stage('navigation'):
+            self.driver.get(MAIN_URL)
+
+        # wait for the elements instead of a fixed time, the page can be returned before it is fully loaded
+        if not self.cookies_rejected:
+            wait_for(self.driver, (By.XPATH, "//*[contains(text(), 'DISAGREE')]"))
+            reject_cookies(self.driver)
+            self.cookies_rejected = True
+            pause(3)
+        else:
+            wait_for(self.driver, (By.XPATH, "//*[contains(text(), 'FA Rankings')]"))
+
+        return self.driver
+
+    def close(self) -> None:
+        """
+        Close the browser if it was started
+
+        @return: None
+        """
+        if self.driver is not None:
+            quit_driver(self.driver)
+            self.driver = None
+            self.cookies_rejected = False
+
+    def __enter__(self) -> 'BrowserSession':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def use_session(session: BrowserSession = None):
+    """
+    Use the shared session if it is given or a new one that is closed at the end
+
+    @param session: Session shared by several scrapers or None
+    @return: A context manager that returns the session to use
+    """
+    if session is None:
+        return BrowserSession()
+    return nullcontext(session)
@@ -0,0 +1,38 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from constants import MAX_WORKERS, HTTP_HEADERS, HTTP_TIMEOUT
+
+
+def create_session(pool_size: int = MAX_WORKERS) -> requests.Session:
+    """
+    Create a keep-alive HTTP session that reuses the connections to FilmAffinity
+
+    @param pool_size: Number of connections kept open per host
+    @return: A requests session with a connection pool and retries for the temporary errors
+    """
+    retries = Retry(total=3, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504])
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+
+    session = requests.Session()
+    session.headers.update(HTTP_HEADERS)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def fetch_html(session: requests.Session, url: str) -> str:
+    """
+    Download the static html of a page
+
+    @param session: Session used to download the page
+    @param url: Url of the page
+    @return: The html of the page
+    """
+    response = session.get(url, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    # without a charset in the headers requests decodes the html as latin-1, the browser reads the meta charset
+    if 'charset' not in response.headers.get('content-type', '').lower():
+        response.encoding = response.apparent_encoding
+    return response.text
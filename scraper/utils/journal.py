@@ -0,0 +1,66 @@
+import json
+import os
+import threading
+
+from scraper import logger
+from constants import JOURNAL_PATH
+
+
+class Journal(object):
+    def __init__(self, name: str, path: str = JOURNAL_PATH):
+        """
+        Append-only journal of the films already extracted by a scraper, used to resume a crashed run
+
+        @param name: Name of the scraper, used as the name of the file
+        @param path: Folder where the journals are saved
+        """
+        self.file = os.path.join(path, f"{name}.jsonl")
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, tuple[str, tuple]]:
+        """
+        Read the films saved by a previous run
+
+        @return: A dictionary with the url of every film as key and its title and extracted data as value
+        """
+        done = dict()
+        if not os.path.exists(self.file):
+            return done
+
+        with open(self.file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    done[record['url']] = (record['title'], tuple(record['data']))
+                except (ValueError, KeyError):
+                    # the last line can be half written if the run crashed
+                    logger.warning(f"Skipping a broken line of the journal {self.file}")
+
+        if done:
+            logger.info(f"Resuming {len(done)} films from the journal {self.file}")
+        return done
+
+    def append(self, movie_title: str, movie_url: str, data: tuple) -> None:
+        """
+        Save the data extracted from a film
+
+        @param movie_title: Title of the film
+        @param movie_url: Url of the film
+        @param data: Data extracted from the page of the film
+        @return: None
+        """
+        line = json.dumps({'title': movie_title, 'url': movie_url, 'data': data}, ensure_ascii=False)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.file), exist_ok=True)
+            with open(self.file, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def clear(self) -> None:
+        """
+        Remove the journal once the data is safely saved in the csv
+
+        @return: None
+        """
+        with self._lock:
+            if os.path.exists(self.file):
+                os.remove(self.file)
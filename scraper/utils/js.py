@@ -0,0 +1,154 @@
+import json
+import time
+
+from scraper import logger
+from log.metrics import metrics
+
+# Names and urls of the films of the top 1000 FA
+TOP_TITLES_SCRIPT = """
+return Array.from(document.querySelectorAll('.mc-title')).map(function (element) {
+    var link = element.querySelector('a');
+    return [element.textContent.trim(), link ? link.getAttribute('href') : null];
+});
+"""
+
+# Header, rows and film urls of the box office table whose header starts with arguments[0]
+BOX_OFFICE_SCRIPT = """
+var name = arguments[0];
+var header = Array.from(document.querySelectorAll('.header')).find(function (item) {
+    return item.textContent.trim().startsWith(name);
+});
+if (!header) {
+    return null;
+}
+var table = header.parentElement;
+var thead = table.querySelector('thead');
+var tbody = table.querySelector('tbody');
+if (!thead || !tbody) {
+    return {columns: null, rows: [], urls: []};
+}
+var rows = Array.from(tbody.querySelectorAll('tr'));
+return {
+    columns: Array.from(thead.querySelectorAll('th')).map(function (th) { return th.textContent; }),
+    rows: rows.map(function (tr) {
+        return Array.from(tr.querySelectorAll('td')).map(function (td) { return td.textContent; });
+    }),
+    urls: rows.map(function (tr) {
+        var link = tr.querySelector('a[href]');
+        return link ? link.getAttribute('href') : null;
+    })
+};
+"""
+
+# Fields of the film cards that match the selector arguments[0], arguments[1] is the definition of the fields of a
+# CardSpec, read as CardSpec.extract reads them
+CARDS_SCRIPT = """
+var cardsSelector = arguments[0];
+var fields = arguments[1];
+var read = function (element, field) {
+    var value = field.attr ? element.getAttribute(field.attr) : element.textContent;
+    return field.strip && value !== null ? value.trim() : value;
+};
+var extract = function (card, field) {
+    for (var i = 0; i < field.alternatives.length; i++) {
+        var scope = field.alternatives[i][0];
+        var root = scope ? card.querySelector(':scope ' + scope) : card;
+        if (!root) {
+            continue;
+        }
+        var elements = Array.from(root.querySelectorAll(':scope ' + field.alternatives[i][1]));
+        // a scoped alternative is used when its scope is found, even without any element inside it
+        if (elements.length || scope) {
+            if (field.many) {
+                return elements.map(function (element) { return read(element, field); });
+            }
+            return elements.length ? read(elements[0], field) : null;
+        }
+    }
+    return field.many ? [] : null;
+};
+return Array.from(document.querySelectorAll(cardsSelector)).map(function (card) {
+    var row = {};
+    fields.forEach(function (field) { row[field.name] = extract(card, field); });
+    return row;
+});
+"""
+
+
+# Whether the netflix releases page has a next date button and the url it links to (null if it is not a link)
+NEXT_DATE_SCRIPT = """
+var button = document.querySelector('.next-date-cat');
+if (!button) {
+    return {found: false, url: null};
+}
+var link = button.closest('a[href]') || button.querySelector('a[href]');
+return {found: true, url: link ? link.href : null};
+"""
+
+
+# Click "show-more" until the list is exhausted or has arguments[0] films (0 for all), waiting for the new films with
+# a MutationObserver instead of fixed sleeps. arguments[1] are the milliseconds without new films to consider the list
+# exhausted. It is executed with execute_async_script and returns the number of films loaded
+LOAD_ALL_SCRIPT = """
+var target = arguments[0];
+var stallTime = arguments[1];
+var done = arguments[arguments.length - 1];
+var count = function () { return document.querySelectorAll('.mc-title').length; };
+var loaded = count();
+var timer = null;
+
+var finish = function () {
+    observer.disconnect();
+    clearTimeout(timer);
+    done(count());
+};
+
+var next = function () {
+    var button = document.querySelector('.show-more');
+    if ((target && count() >= target) || !button || button.offsetParent === null) {
+        finish();
+        return;
+    }
+    button.scrollIntoView();
+    button.click();
+    // if no film arrives after the click the list is exhausted
+    clearTimeout(timer);
+    timer = setTimeout(finish, stallTime);
+};
+
+var observer = new MutationObserver(function () {
+    if (count() > loaded) {
+        // click again once the new films stop arriving
+        loaded = count();
+        clearTimeout(timer);
+        timer = setTimeout(next, 100);
+    }
+});
+observer.observe(document.body, {childList: true, subtree: true});
+next();
+"""
+
+
+def run_script(driver, script: str, name: str, *args, asynchronous: bool = False):
+    """
+    Execute an extraction script inside the page, only the extracted fields are sent back from the browser
+    instead of the whole page_source
+
+    @param driver: Driver of the page
+    @param script: Javascript code that returns the extracted data
+    @param name: Name of the extraction, used in the log
+    @param args: Arguments of the script (arguments[0], arguments[1]...)
+    @param asynchronous: Execute it with execute_async_script, the script returns by calling its last argument
+    @return: The data returned by the script
+    """
+    start = time.perf_counter()
+    if asynchronous:
+        result = driver.execute_async_script(script, *args)
+    else:
+        result = driver.execute_script(script, *args)
+    elapsed = time.perf_counter() - start
+    metrics.observe('script', elapsed)
+
+    size = len(json.dumps(result, ensure_ascii=False).encode('utf-8'))
+    logger.debug(f"Script {name}: {size / 1024:.1f} KB transferred and extracted in {elapsed * 1000:.0f} ms")
+    return result
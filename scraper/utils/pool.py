@@ -0,0 +1,204 @@
+import asyncio
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from bs4 import SoupStrainer
+
+from scraper import logger
+from scraper.utils.driver import create_driver, quit_driver, get_page_source
+from scraper.utils.http import create_session, fetch_html
+from scraper.utils.crawler import crawl
+from scraper.utils.cache import html_cache
+from scraper.utils.archive import page_archive, unwrap
+from scraper.utils.registry import film_registry, film_id
+from log.metrics import metrics
+from scraper.utils.journal import Journal
+from scraper.utils.document import Document
+from constants import MAX_WORKERS, SELENIUM_BACKEND, HTTP_BACKEND, ASYNC_BACKEND
+
+
+def _crawl_worker(fetch: Callable[[str], str], tasks: queue.Queue, save: Callable, extract: Callable) -> None:
+    """
+    Download the pages of the queue until there are no more pages left
+
+    @param fetch: Function that returns the html of a given url
+    @param tasks: Queue of (index, title, url) to visit
+    @param save: Function that saves the extracted data with its index, title and url
+    @param extract: Function that extracts the data from the url and the html of a film page
+    @return: None
+    """
+    while True:
+        try:
+            index, movie_title, movie_url = tasks.get_nowait()
+        except queue.Empty:
+            return
+
+        try:
+            with metrics.stage('fetch'):
+                html_content = fetch(movie_url)
+            save(index, movie_title, movie_url, extract(movie_url, html_content))
+        except Exception as e:
+            logger.error(f'Error extracting data from the film {str(movie_title).upper()}: {e}')
+
+
+def _start_browser_worker(driver, tasks: queue.Queue, save: Callable, extract: Callable,
+                          locator: tuple[str, str] = None) -> None:
+    """
+    Start a browser worker, creating its own driver if it is not given
+
+    @param driver: Driver to reuse or None to create a new one
+    @param tasks: Queue of (index, title, url) to visit
+    @param save: Function that saves the extracted data with its index, title and url
+    @param extract: Function that extracts the data from the url and the html of a film page
+    @param locator: Tuple (By, value) of an element that must be in the page before it is extracted
+    @return: None
+    """
+    own_driver = driver is None
+    if own_driver:
+        try:
+            driver = create_driver(block=False)
+        except Exception as e:
+            logger.error(f"Could not start a new browser for the worker: {e}")
+            return
+
+    try:
+        _crawl_worker(html_cache.cached(partial(get_page_source, driver, locator=locator)), tasks, save, extract)
+    finally:
+        if own_driver:
+            quit_driver(driver)
+
+
+async def _crawl_async(pending: list[tuple[int, str, str]], save: Callable, extract: Callable) -> None:
+    """
+    Extract the data of every page as soon as the asyncio crawler downloads it
+
+    @param pending: List of (index, title, url) to download
+    @param save: Function that saves the extracted data with its index, title and url
+    @param extract: Function that extracts the data from the url and the html of a film page
+    @return: None
+    """
+    title_list = [(movie_title, movie_url) for _, movie_title, movie_url in pending]
+    async for position, movie_title, html_content in crawl(title_list):
+        index, _, movie_url = pending[position]
+        try:
+            save(index, movie_title, movie_url, extract(movie_url, html_content))
+        except Exception as e:
+            logger.error(f'Error extracting data from the film {str(movie_title).upper()}: {e}')
+
+
+def crawl_pages(driver, title_list: list[tuple[str, str]], extract: Callable, n_workers: int = 1,
+                backend: str = SELENIUM_BACKEND, journal: Journal = None,
+                parse_only: SoupStrainer = None, locator: tuple[str, str] = None) -> list[tuple[str, str, Any]]:
+    """
+    Download the page of every film with a pool of workers and extract its data
+
+    @param driver: Driver already opened, it is used by the first browser worker
+    @param title_list: List containing the title and url of each movie
+    @param extract: Function that extracts the data from the document of a film page
+    @param n_workers: Number of pages downloaded at the same time (capped by MAX_WORKERS, not used by ASYNC_BACKEND)
+    @param backend: SELENIUM_BACKEND to load the pages in browsers, HTTP_BACKEND to download the static html or
+                    ASYNC_BACKEND to download the static html with the asyncio crawler
+    @param journal: Journal where every extracted film is saved, the films already in it are not downloaded again
+    @param parse_only: Strainer to parse only the subtrees of the film pages read by extract
+    @param locator: Tuple (By, value) of an element that the browsers wait for before extracting a film page
+    @return: A list of tuples with the title, the url and the extracted data, in the same order as title_list
+    """
+    extractor = f"{extract.__module__}.{extract.__qualname__}"
+
+    def extract_html(movie_url: str, html_content: str) -> Any:
+        # every page is parsed once, only in the subtrees that are read
+        with metrics.stage('extract'):
+            data = extract(Document(html_content, parse_only))
+        film_registry.put_data(movie_url, extractor, data)
+        return data
+
+    def extract_page(movie_url: str, html_content: str) -> Any:
+        if page_archive.recording:
+            page_archive.record_page(movie_url, html_content)
+        film_registry.put_page(movie_url, html_content)
+        return extract_html(movie_url, html_content)
+
+    # the archive has to contain every page, so the journal of a previous run is not used when recording or replaying
+    if page_archive.mode:
+        journal = None
+
+    results = dict()
+    done = journal.load() if journal else dict()
+
+    def save(index: int, movie_title: str, movie_url: str, data: Any) -> None:
+        results[index] = (movie_title, movie_url, data)
+        if journal:
+            journal.append(movie_title, movie_url, data)
+
+    # the films saved in the journal by a previous run are not downloaded again, neither the films downloaded in
+    # this run by another scraper nor the films repeated in the list
+    pending = list()
+    first_index = dict()
+    repeated = dict()
+    for index, (movie_title, movie_url) in enumerate(title_list):
+        key = film_id(movie_url)
+        if movie_url in done:
+            results[index] = (movie_title, movie_url, done[movie_url][1])
+            continue
+
+        found, data = film_registry.get_data(movie_url, extractor)
+        html_content = None if found else film_registry.get_page(movie_url)
+        if found:
+            save(index, movie_title, movie_url, data)
+        elif html_content is not None:
+            try:
+                save(index, movie_title, movie_url, extract_html(movie_url, html_content))
+            except Exception as e:
+                logger.error(f'Error extracting data from the film {str(movie_title).upper()}: {e}')
+        elif key is not None and key in first_index:
+            repeated[index] = first_index[key]
+        else:
+            if key is not None:
+                first_index[key] = index
+            pending.append((index, movie_title, movie_url))
+
+    n_workers = max(1, min(n_workers, MAX_WORKERS, len(pending)))
+    tasks = queue.Queue()
+    for task in pending:
+        tasks.put(task)
+
+    if not pending:
+        logger.info("All the films were already extracted")
+    elif page_archive.replaying:
+        logger.info(f"Replaying {len(pending)} pages from the archive")
+        _crawl_worker(page_archive.page, tasks, save, extract_page)
+    elif backend == ASYNC_BACKEND:
+        logger.info(f"Downloading {len(pending)} pages with the asyncio crawler")
+        asyncio.run(_crawl_async(pending, save, extract_page))
+    elif backend == HTTP_BACKEND:
+        logger.info(f"Downloading {len(pending)} pages with {n_workers} HTTP workers")
+        with create_session(n_workers) as session:
+            with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix='crawler') as executor:
+                for _ in range(n_workers):
+                    executor.submit(_crawl_worker, html_cache.cached(partial(fetch_html, session)), tasks, save,
+                                    extract_page)
+    elif backend == SELENIUM_BACKEND:
+        # the film pages are recorded with record_page, not as calls of the session
+        driver = unwrap(driver)
+        if n_workers == 1:
+            _crawl_worker(html_cache.cached(partial(get_page_source, driver, locator=locator)), tasks, save,
+                          extract_page)
+        else:
+            logger.info(f"Crawling {len(pending)} pages with {n_workers} browsers")
+            drivers = [driver] + [None] * (n_workers - 1)
+            with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix='crawler') as executor:
+                for worker_driver in drivers:
+                    executor.submit(_start_browser_worker, worker_driver, tasks, save, extract_page, locator)
+    else:
+        raise Exception(f"Unknown backend {backend}")
+
+    # the repeated films take the data of their first appearance
+    for index, first in repeated.items():
+        if first in results:
+            movie_title, movie_url = title_list[index]
+            results[index] = (movie_title, movie_url, results[first][2])
+
+    # merge the results back in the order of the ranking
+    return [results[index] for index in sorted(results)]
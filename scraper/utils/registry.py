@@ -0,0 +1,104 @@
+import re
+import threading
+import zlib
+from typing import Any
+
+from scraper import logger
+
+# The urls of the films are like https://www.filmaffinity.com/us/film123456.html
+FILM_ID_PATTERN = re.compile(r'film(\d+)\.html')
+FILM_ID_DTYPES = {'Film_id': 'Int64'}
+
+
+def film_id(url: str | None) -> int | None:
+    """
+    FilmAffinity id of a film, it is the same for all the locales and all the scrapers
+
+    @param url: Url of the page of the film, absolute or relative
+    @return: The id of the film or None if the url is not the page of a film
+    """
+    if not url:
+        return None
+    match = FILM_ID_PATTERN.search(url)
+    return int(match.group(1)) if match else None
+
+
+class FilmRegistry(object):
+    def __init__(self):
+        """
+        Film pages downloaded during the run and the data extracted from them, addressed by the film id, so a
+        film page is downloaded and extracted at most once whichever scraper asks for it first
+        """
+        self._pages = dict()
+        self._data = dict()
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def get_page(self, url: str) -> str | None:
+        """
+        Html of a film page that was already downloaded in the run
+
+        @param url: Url of the page of the film
+        @return: The html or None if it was not downloaded
+        """
+        with self._lock:
+            page = self._pages.get(film_id(url))
+        if page is None:
+            return None
+        return zlib.decompress(page).decode('utf-8')
+
+    def put_page(self, url: str, html_content: str) -> None:
+        """
+        Save a film page, compressed to keep the memory low
+
+        @param url: Url of the page of the film
+        @param html_content: Html of the page
+        @return: None
+        """
+        key = film_id(url)
+        if key is None:
+            return
+        page = zlib.compress(html_content.encode('utf-8'), 1)
+        with self._lock:
+            self._pages[key] = page
+
+    def get_data(self, url: str, extractor: str) -> tuple[bool, Any]:
+        """
+        Data already extracted from a film page by the same extractor
+
+        @param url: Url of the page of the film
+        @param extractor: Name of the extractor
+        @return: True and the data if it was extracted, otherwise False and None
+        """
+        key = (film_id(url), extractor)
+        with self._lock:
+            if key[0] is None or key not in self._data:
+                return False, None
+            self.hits += 1
+            return True, self._data[key]
+
+    def put_data(self, url: str, extractor: str, data: Any) -> None:
+        """
+        Save the data extracted from a film page
+
+        @param url: Url of the page of the film
+        @param extractor: Name of the extractor
+        @param data: Extracted data
+        @return: None
+        """
+        key = film_id(url)
+        if key is None:
+            return
+        with self._lock:
+            self._data[(key, extractor)] = data
+
+    def log_summary(self) -> None:
+        """
+        Log the number of film pages of the run and the extractions that were not repeated
+
+        @return: None
+        """
+        logger.info(f"Film registry: {len(self._pages)} film pages, {self.hits} extractions reused")
+
+
+film_registry = FilmRegistry()
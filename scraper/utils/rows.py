@@ -0,0 +1,53 @@
+import pandas as pd
+
+
+class RowBuilder(object):
+    def __init__(self, columns: list[str], dtypes: dict = None):
+        """
+        Columnar accumulator of rows, every column is saved in its own list and the DataFrame is built only once
+        (adding rows with df.loc[len(df)] copies the whole DataFrame every time)
+
+        @param columns: Names of the columns, in order
+        @param dtypes: Optional pandas dtype for some of the columns
+        """
+        self.columns = list(columns)
+        self.dtypes = dtypes or dict()
+        self._data = {column: list() for column in self.columns}
+
+    def append(self, row: dict) -> None:
+        """
+        Add a new row, the missing columns are saved as None
+
+        @param row: Dictionary with the value of every column
+        @return: None
+        """
+        unknown = set(row) - set(self._data)
+        if unknown:
+            raise Exception(f"The row has columns that are not in the table: {unknown}")
+
+        for column, values in self._data.items():
+            values.append(row.get(column))
+
+    def extend(self, rows: list[dict]) -> None:
+        """
+        Add several rows
+
+        @param rows: List of dictionaries with the value of every column
+        @return: None
+        """
+        for row in rows:
+            self.append(row)
+
+    def __len__(self) -> int:
+        return len(self._data[self.columns[0]]) if self.columns else 0
+
+    def to_df(self) -> pd.DataFrame:
+        """
+        Build the DataFrame with all the rows added
+
+        @return: A Pandas Dataframe with the columns in order and their dtypes
+        """
+        df = pd.DataFrame(self._data, columns=self.columns)
+        if self.dtypes:
+            df = df.astype(self.dtypes)
+        return df
@@ -0,0 +1,225 @@
+import re
+from collections import defaultdict
+
+from bs4 import Tag
+
+# A compound selector: optional tag followed by .class, #id, [attribute] and :not([attribute])
+_COMPOUND = re.compile(r'([a-zA-Z][\w-]*)?((?:\.[\w-]+|#[\w-]+|\[[\w-]+\]|:not\(\[[\w-]+\]\))*)$')
+_SIMPLE = re.compile(r'\.([\w-]+)|#([\w-]+)|\[([\w-]+)\]|:not\(\[([\w-]+)\]\)')
+
+
+class Selector(object):
+    """
+    Small subset of CSS: compound selectors (tag, .class, #id, [attribute], :not([attribute])) separated by spaces
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = [self._parse(part) for part in text.split()]
+        if not self.parts:
+            raise ValueError("Empty selector")
+
+        # Key of the index of the spec, elements whose key does not match are not checked
+        tag, classes, element_id, _, _ = self.parts[-1]
+        if classes:
+            self.key = ('class', min(classes))
+        elif element_id:
+            self.key = ('id', element_id)
+        elif tag:
+            self.key = ('tag', tag)
+        else:
+            self.key = ('any', None)
+
+    @staticmethod
+    def _parse(part: str) -> tuple:
+        """
+        Parse a compound selector
+
+        @param part: Compound selector without spaces
+        @return: Tuple (tag, classes, id, attributes that must be present, attributes that must be absent)
+        """
+        match = _COMPOUND.match(part)
+        if not match:
+            raise ValueError(f"Unsupported selector: {part}")
+
+        classes, element_id, present, absent = set(), None, list(), list()
+        for class_name, id_name, attribute, not_attribute in _SIMPLE.findall(match.group(2)):
+            if class_name:
+                classes.add(class_name)
+            elif id_name:
+                element_id = id_name
+            elif attribute:
+                present.append(attribute)
+            else:
+                absent.append(not_attribute)
+        return match.group(1), frozenset(classes), element_id, tuple(present), tuple(absent)
+
+    @staticmethod
+    def _matches_part(element: Tag, part: tuple) -> bool:
+        tag, classes, element_id, present, absent = part
+        attrs = element.attrs
+        if tag and element.name != tag:
+            return False
+        if classes and not classes.issubset(attrs.get('class') or ()):
+            return False
+        if element_id and attrs.get('id') != element_id:
+            return False
+        return all(name in attrs for name in present) and not any(name in attrs for name in absent)
+
+    def matches(self, element: Tag, root: Tag) -> bool:
+        """
+        Check if an element matches the selector, the ancestors are only looked for inside the root
+
+        @param element: Element to check
+        @param root: Card that is being extracted
+        @return: True if the element matches
+        """
+        if not self._matches_part(element, self.parts[-1]):
+            return False
+
+        remaining = len(self.parts) - 2
+        parent = element.parent
+        while remaining >= 0 and parent is not None and parent is not root:
+            if self._matches_part(parent, self.parts[remaining]):
+                remaining -= 1
+            parent = parent.parent
+        return remaining < 0
+
+
+class Field(object):
+    """
+    Field of a card: the selectors are alternatives in order of preference, the first one that matches is used
+    """
+
+    def __init__(self, name: str, selectors, attr: str = None, many: bool = False, strip: bool = False):
+        """
+        @param name: Name of the field in the extracted dictionary
+        @param selectors: Selector or tuple of alternatives. An alternative is a selector, used if some element
+        matches it, or a tuple (scope, selector), used if the card has an element matching scope: the values are then
+        the matches of selector inside the first of them, even if there is none
+        @param attr: Attribute to read, None to read the text of the element
+        @param many: Return a list with the values of every matching element instead of the first one
+        @param strip: Strip the values
+        """
+        if isinstance(selectors, str):
+            selectors = (selectors,)
+        self.name = name
+        self.alternatives = [tuple(selector) if isinstance(selector, tuple) else (None, selector)
+                             for selector in selectors]
+        self.scopes = [Selector(scope) if scope else None for scope, _ in self.alternatives]
+        self.selectors = [Selector(selector) for _, selector in self.alternatives]
+        self.attr = attr
+        self.many = many
+        self.strip = strip
+
+    def value(self, element: Tag):
+        value = element.get_text() if self.attr is None else element.get(self.attr)
+        if self.strip and value is not None:
+            value = value.strip()
+        return value
+
+    def definition(self) -> dict:
+        """
+        Definition of the field for the scripts executed inside the browser (CARDS_SCRIPT)
+        """
+        return {'name': self.name, 'alternatives': [list(alternative) for alternative in self.alternatives],
+                'attr': self.attr, 'many': self.many, 'strip': self.strip}
+
+
+class CardSpec(object):
+    """
+    Declarative description of the fields of a card. The selectors are compiled once and all the fields are filled
+    in a single traversal of the card instead of a find/find_all per field
+    """
+
+    def __init__(self, fields: list[Field]):
+        self.fields = list(fields)
+
+        # Selectors (and scopes) grouped by the key of their last compound selector
+        self._index = defaultdict(list)
+        for field_position, field in enumerate(self.fields):
+            for alternative, (scope, selector) in enumerate(zip(field.scopes, field.selectors)):
+                self._index[selector.key].append((field_position, alternative, selector, False))
+                if scope is not None:
+                    self._index[scope.key].append((field_position, alternative, scope, True))
+        self._any = self._index.get(('any', None), [])
+
+        # The traversal can stop once every field has its preferred value, only if no field needs every match
+        self._stop_early = not any(field.many for field in self.fields)
+
+    def _candidates(self, element: Tag) -> list:
+        candidates = list(self._any)
+        for class_name in set(element.attrs.get('class') or ()):
+            candidates.extend(self._index.get(('class', class_name), ()))
+        if 'id' in element.attrs:
+            candidates.extend(self._index.get(('id', element.attrs['id']), ()))
+        candidates.extend(self._index.get(('tag', element.name), ()))
+        return candidates
+
+    def extract(self, card: Tag) -> dict:
+        """
+        Extract the fields of a card
+
+        @param card: Element of the card
+        @return: Dictionary with the value of every field, None (or an empty list) if it was not found
+        """
+        found = dict()
+        # first element of the scope of every scoped alternative found in the card
+        scopes = dict()
+        complete = 0
+        for element in card.descendants:
+            if not isinstance(element, Tag):
+                continue
+
+            for field_position, alternative, selector, is_scope in self._candidates(element):
+                field = self.fields[field_position]
+                key = (field_position, alternative)
+                if is_scope:
+                    if key not in scopes and selector.matches(element, card):
+                        scopes[key] = element
+                    continue
+
+                root = card
+                if field.scopes[alternative] is not None:
+                    root = scopes.get(key)
+                    if root is None or not any(parent is root for parent in element.parents):
+                        continue
+                if (not field.many and key in found) or not selector.matches(element, root):
+                    continue
+
+                if field.many:
+                    found.setdefault(key, []).append(field.value(element))
+                else:
+                    found[key] = field.value(element)
+                    if alternative == 0:
+                        complete += 1
+
+            if self._stop_early and complete == len(self.fields):
+                break
+
+        row = dict()
+        for field_position, field in enumerate(self.fields):
+            row[field.name] = [] if field.many else None
+            for alternative in range(len(field.selectors)):
+                key = (field_position, alternative)
+                if key in found or key in scopes:
+                    row[field.name] = found.get(key, row[field.name])
+                    break
+        return row
+
+    def extract_all(self, cards) -> list[dict]:
+        """
+        Extract the fields of several cards
+
+        @param cards: Elements of the cards
+        @return: List with a dictionary for every card
+        """
+        return [self.extract(card) for card in cards]
+
+    def definition(self) -> list[dict]:
+        """
+        Definition of the fields for the scripts executed inside the browser, so both extractions read the same fields
+
+        @return: List with the definition of every field
+        """
+        return [field.definition() for field in self.fields]
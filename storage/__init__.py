@@ -0,0 +1,174 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from storage.database import film_store
+from constants import DATA_PATH, STORAGE_FORMAT, CSV_FORMAT, PARQUET_FORMAT, FILM_DATABASE
+
+# Columns with a list of values in every row of the datasets, saved as a native list column in the parquet files and
+# as text separated by SEPARATOR in the csv files
+LIST_COLUMNS = {
+    'top_films': ['Directors', 'genres', 'Actors'],
+    'releases': ['Producers'],
+    'box_office': [],
+    'netflix_releases': ['Origin_country', 'genres'],
+    'netflix_most_voted': ['Origin_country', 'Genres'],
+    'netflix_best': ['Origin_country', 'Genres'],
+}
+SEPARATOR = ', '
+
+
+def dataset_path(name: str, storage_format: str = STORAGE_FORMAT) -> str:
+    """
+    Path of a dataset in the data folder
+
+    @param name: Name of the dataset, a key of LIST_COLUMNS
+    @param storage_format: CSV_FORMAT or PARQUET_FORMAT, it is also the extension of the file
+    @return: The path of the file
+    """
+    return os.path.join(DATA_PATH, f'{name}.{storage_format}')
+
+
+def dataset_exists(name: str) -> bool:
+    """
+    Check if a dataset is saved in the data folder, in any format
+
+    @param name: Name of the dataset, a key of LIST_COLUMNS
+    @return: True if the dataset was saved
+    """
+    return any(os.path.exists(dataset_path(name, storage_format)) for storage_format in (CSV_FORMAT, PARQUET_FORMAT))
+
+
+def saved_format(name: str, storage_format: str = STORAGE_FORMAT) -> str:
+    """
+    Format to read a dataset in, the given one unless the dataset is only saved in the other one
+
+    @param name: Name of the dataset, a key of LIST_COLUMNS
+    @param storage_format: CSV_FORMAT or PARQUET_FORMAT
+    @return: CSV_FORMAT or PARQUET_FORMAT
+    """
+    other_format = CSV_FORMAT if storage_format == PARQUET_FORMAT else PARQUET_FORMAT
+    if not os.path.exists(dataset_path(name, storage_format)) and os.path.exists(dataset_path(name, other_format)):
+        return other_format
+    return storage_format
+
+
+def _parquet():
+    # pyarrow is only needed (and imported) with PARQUET_FORMAT
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise Exception("The parquet storage needs pyarrow, install it with: pip install pyarrow")
+    return pyarrow, pyarrow.parquet
+
+
+def _join(values: list | None) -> str | None:
+    # the same text as str(list)[1:-1].replace("'", '') used before the list columns, so the csv files do not change
+    if values is None:
+        return None
+    return str(list(values))[1:-1].replace('\'', '')
+
+
+def _split(text) -> list[str] | None:
+    return text.split(SEPARATOR) if isinstance(text, str) else None
+
+
+def _to_lists(column) -> list[list[str] | None]:
+    """
+    Convert a list column of a parquet file to Python lists, without parsing any text. The names are converted once
+    and shared by all the rows where they appear (to_pylist creates every string and list one by one)
+
+    @param column: Chunked array of a list column
+    @return: A list with the list of every row, None for the missing ones
+    """
+    pyarrow, _ = _parquet()
+    column = column.combine_chunks()
+    if not pyarrow.types.is_list(column.type):
+        # a column without any value is saved with the null type
+        return [None] * len(column)
+
+    offsets = column.offsets.to_numpy().tolist()
+    encoded = pyarrow.compute.dictionary_encode(column.values)
+    names = np.array(encoded.dictionary.to_pylist(), dtype=object)
+    values = names[encoded.indices.to_numpy()].tolist()
+    valid = column.is_valid().to_numpy(zero_copy_only=False).tolist()
+    return [values[start:end] if is_valid else None for start, end, is_valid in zip(offsets, offsets[1:], valid)]
+
+
+def _to_typed(df: pd.DataFrame, list_columns: list[str]) -> pd.DataFrame:
+    """
+    Give the parquet file the types that read_csv would infer: the numeric text columns are saved as numbers, the empty
+    texts and lists as missing values
+
+    @param df: Dataset to save
+    @param list_columns: List columns of the dataset
+    @return: A copy of the dataset with the types of the parquet file
+    """
+    df = df.copy()
+    for column in df.columns:
+        if column in list_columns:
+            df[column] = [list(values) if isinstance(values, (list, tuple)) and values else None
+                          for values in df[column]]
+        elif df[column].dtype == object:
+            values = df[column].where(df[column] != '', None)
+            numbers = pd.to_numeric(values, errors='coerce')
+            df[column] = numbers if numbers.notna().equals(values.notna()) else values
+    return df
+
+
+def save_dataset(df: pd.DataFrame, name: str, storage_format: str = STORAGE_FORMAT,
+                 database: bool = FILM_DATABASE) -> None:
+    """
+    Save a dataset in the data folder
+
+    @param df: Dataset, its list columns contain lists of strings (or None)
+    @param name: Name of the dataset, a key of LIST_COLUMNS
+    @param storage_format: CSV_FORMAT or PARQUET_FORMAT
+    @param database: Save the dataset in the film database too
+    @return: None
+    """
+    list_columns = [column for column in LIST_COLUMNS[name] if column in df.columns]
+    if storage_format == PARQUET_FORMAT:
+        pyarrow, parquet = _parquet()
+        table = pyarrow.Table.from_pandas(_to_typed(df, list_columns), preserve_index=False)
+        parquet.write_table(table, dataset_path(name, PARQUET_FORMAT))
+    else:
+        df_csv = df.assign(**{column: df[column].map(_join, na_action='ignore') for column in list_columns})
+        df_csv.to_csv(dataset_path(name, CSV_FORMAT), index=False)
+
+    if database:
+        film_store.save(df, name)
+
+
+def load_dataset(name: str, columns: list[str] = None, storage_format: str = STORAGE_FORMAT) -> pd.DataFrame:
+    """
+    Load a dataset of the data folder, with its list columns as lists. The parquet files are memory mapped and only the
+    given columns are read. If the dataset is not saved in the given format, the other format is read
+
+    @param name: Name of the dataset, a key of LIST_COLUMNS
+    @param columns: Columns to read, all of them by default
+    @param storage_format: CSV_FORMAT or PARQUET_FORMAT
+    @return: A Pandas Dataframe with the list columns as lists of strings (None when there are no values)
+    """
+    storage_format = saved_format(name, storage_format)
+    if storage_format == PARQUET_FORMAT:
+        _, parquet = _parquet()
+        table = parquet.read_table(dataset_path(name, PARQUET_FORMAT), columns=columns, memory_map=True)
+        list_columns = [column for column in LIST_COLUMNS[name] if column in table.column_names]
+        other_columns = [column for column in table.column_names if column not in list_columns]
+        if other_columns:
+            df = table.select(other_columns).to_pandas()
+        else:
+            df = pd.DataFrame(index=pd.RangeIndex(table.num_rows))
+        for column in list_columns:
+            df[column] = _to_lists(table.column(column))
+        return df[table.column_names]
+
+    df = pd.read_csv(dataset_path(name, CSV_FORMAT), usecols=columns)
+    for column in LIST_COLUMNS[name]:
+        if column in df.columns:
+            df[column] = df[column].map(_split)
+    return df
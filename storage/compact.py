@@ -0,0 +1,308 @@
+import numpy as np
+import pandas as pd
+
+from storage import LIST_COLUMNS, SEPARATOR, PARQUET_FORMAT, CSV_FORMAT, dataset_path, saved_format, _parquet, \
+    _split
+from constants import STORAGE_FORMAT
+
+
+class Vocabulary(object):
+    def __init__(self):
+        """
+        Distinct names of a compact table, every name is saved once and identified by its position (its id)
+        """
+        self.names = list()
+        self.ids = dict()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, names) -> np.ndarray:
+        """
+        Ids of some names, the new ones are added to the vocabulary
+
+        @param names: Sequence of names, the spaces around them are removed
+        @return: An array with the id of every name
+        """
+        ids = np.empty(len(names), dtype=np.int32)
+        for index, name in enumerate(names):
+            name = name.strip()
+            if name not in self.ids:
+                self.ids[name] = len(self.names)
+                self.names.append(name)
+            ids[index] = self.ids[name]
+        return ids
+
+    def lookup(self, ids) -> list[str]:
+        """
+        Names of some ids
+
+        @param ids: Sequence of ids of the vocabulary
+        @return: A list with the name of every id
+        """
+        return [self.names[name_id] for name_id in ids]
+
+
+def _offsets(lengths: np.ndarray) -> np.ndarray:
+    # start of every row and the end of the last one, 32 bits as the offsets of the parquet lists
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def rank(*ids: np.ndarray, value_counts: bool = False) -> tuple[np.ndarray, ...]:
+    """
+    Count the distinct values (or combinations of values of several arrays of the same length), from the most
+    frequent. The ties keep the order of their first appearance, as counting them one by one in a dictionary and
+    sorting them with sorted
+
+    @param ids: Arrays of ids of the same length, the values of every position are a combination
+    @param value_counts: Order the ties as Series.value_counts does instead, its sort is not stable
+    @return: An array with every distinct value of each given array (in the same order) and an array with their counts
+    """
+    codes = np.zeros(len(ids[0]), dtype=np.int64)
+    sizes = [int(values.max()) + 1 if len(values) else 1 for values in ids]
+    for values, size in zip(ids, sizes):
+        codes = codes * size + values
+    distinct, first, counts = np.unique(codes, return_index=True, return_counts=True)
+    if value_counts:
+        # value_counts sorts the counts in order of first appearance with the default sort of sort_values
+        appearance = np.argsort(first)
+        order = appearance[pd.Series(counts[appearance]).sort_values(ascending=False).index.to_numpy()]
+    else:
+        order = np.lexsort((first, -counts))
+    distinct, counts = distinct[order], counts[order]
+
+    # decode the combinations, the last array is the least significant
+    ranked = list()
+    for size in reversed(sizes):
+        ranked.append(distinct % size)
+        distinct = distinct // size
+    return tuple(reversed(ranked)) + (counts,)
+
+
+class ListColumn(object):
+    def __init__(self, offsets: np.ndarray, values: np.ndarray, vocabulary: Vocabulary):
+        """
+        Column with a list of names in every row, saved in two arrays: the ids of all the names one row after another
+        and the position where the names of every row start (CSR format). The names of the row i are
+        values[offsets[i]:offsets[i + 1]], a row without names is empty
+
+        @param offsets: Start of every row in values and the end of the last one, len(column) + 1 positions
+        @param values: Ids of the names in the vocabulary
+        @param vocabulary: Vocabulary of the ids, shared by all the columns of a table
+        """
+        self.offsets = offsets
+        self.values = values
+        self.vocabulary = vocabulary
+
+    @classmethod
+    def from_lists(cls, lists, vocabulary: Vocabulary) -> 'ListColumn':
+        """
+        Create a column from Python lists
+
+        @param lists: Sequence with a list of names (or a missing value) for every row
+        @param vocabulary: Vocabulary where the names are interned
+        @return: The list column
+        """
+        lists = [values if isinstance(values, (list, tuple)) else () for values in lists]
+        offsets = _offsets(np.fromiter(map(len, lists), dtype=np.int32, count=len(lists)))
+        # intern every distinct name once
+        codes, uniques = pd.factorize(np.array([name for values in lists for name in values], dtype=object))
+        ids = vocabulary.intern(uniques)
+        return cls(offsets, ids[codes] if len(codes) else np.empty(0, dtype=np.int32), vocabulary)
+
+    @classmethod
+    def from_arrow(cls, column, vocabulary: Vocabulary) -> 'ListColumn':
+        """
+        Create a column from a list column of a parquet file, without creating any Python list
+
+        @param column: Chunked array of a list column
+        @param vocabulary: Vocabulary where the names are interned
+        @return: The list column
+        """
+        pyarrow, _ = _parquet()
+        column = column.combine_chunks()
+        if not pyarrow.types.is_list(column.type):
+            # a column without any value is saved with the null type
+            return cls(np.zeros(len(column) + 1, dtype=np.int32), np.empty(0, dtype=np.int32), vocabulary)
+
+        # the offsets of a sliced column may not start at 0, and the missing rows are empty
+        offsets = column.offsets.to_numpy().astype(np.int32)
+        start, end = offsets[0], offsets[-1]
+        encoded = pyarrow.compute.dictionary_encode(column.values.slice(start, end - start))
+        ids = vocabulary.intern(encoded.dictionary.to_pylist())
+        values = ids[encoded.indices.to_numpy()] if len(encoded) else np.empty(0, dtype=np.int32)
+        return cls(offsets - start, values, vocabulary)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return self.offsets.nbytes + self.values.nbytes
+
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    def has_values(self) -> np.ndarray:
+        return self.lengths() > 0
+
+    def take(self, rows: np.ndarray) -> 'ListColumn':
+        """
+        Select some rows
+
+        @param rows: Boolean mask or positions of the rows
+        @return: A new list column with the selected rows, in the given order
+        """
+        rows = np.flatnonzero(rows) if rows.dtype == bool else rows
+        lengths = self.lengths()[rows]
+        offsets = _offsets(lengths)
+        # position in values of every name of the selected rows
+        positions = np.repeat(self.offsets[:-1][rows] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return ListColumn(offsets, self.values[positions], self.vocabulary)
+
+    def explode(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        One row per name, as DataFrame.explode
+
+        @return: The row of every name and its id
+        """
+        return np.repeat(np.arange(len(self)), self.lengths()), self.values
+
+    def count(self) -> np.ndarray:
+        """
+        Number of appearances of every name of the vocabulary
+
+        @return: An array with the count of every id
+        """
+        return np.bincount(self.values, minlength=len(self.vocabulary))
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        """
+        Most frequent names of the column
+
+        @param n: Number of names
+        @return: List of names and number of appearances, from the most frequent (the ties in order of first appearance)
+        """
+        ids, counts = rank(self.values)
+        return list(zip(self.vocabulary.lookup(ids[:n]), counts[:n].tolist()))
+
+    def join(self, other: 'ListColumn') -> tuple[np.ndarray, np.ndarray]:
+        """
+        Every pair of names of this column and the other one in the same row, as the rows of joining both exploded
+        columns by row
+
+        @param other: List column of the same rows and vocabulary
+        @return: The id in this column and the id in the other column of every pair
+        """
+        rows, values = self.explode()
+        other_lengths = other.lengths()[rows]
+        # every name of this column is repeated once per name of the other column in its row
+        pairs = np.concatenate(([0], np.cumsum(other_lengths)))
+        positions = np.repeat(other.offsets[:-1][rows] - pairs[:-1], other_lengths) + np.arange(pairs[-1])
+        return np.repeat(values, other_lengths), other.values[positions]
+
+    def to_lists(self) -> list[list[str] | None]:
+        """
+        Convert the column to Python lists, as load_dataset returns them
+
+        @return: A list with the list of names of every row, None for the empty ones
+        """
+        names = self.vocabulary.lookup(self.values)
+        offsets = self.offsets.tolist()
+        return [names[start:end] or None for start, end in zip(offsets, offsets[1:])]
+
+    def join_text(self, separator: str = SEPARATOR) -> list[str | None]:
+        """
+        Names of every row as a single text, as they are saved in the csv files
+
+        @param separator: Text between the names
+        @return: A list with the text of every row, None for the empty ones
+        """
+        return [separator.join(names) if names else None for names in self.to_lists()]
+
+
+class CompactTable(object):
+    def __init__(self, columns: dict, vocabulary: Vocabulary):
+        """
+        Table of films where the list columns are ListColumn (the names saved once in a shared vocabulary) and the
+        other columns NumPy arrays
+
+        @param columns: Columns by name, all of them with the same number of rows
+        @param vocabulary: Vocabulary of all the list columns
+        """
+        self.columns = columns
+        self.vocabulary = vocabulary
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, list_columns: list[str]) -> 'CompactTable':
+        """
+        Create a table from a Dataframe with Python lists, as load_dataset returns them
+
+        @param df: Dataset
+        @param list_columns: Columns of the dataset with a list in every row
+        @return: The compact table
+        """
+        vocabulary = Vocabulary()
+        columns = {column: ListColumn.from_lists(df[column], vocabulary) if column in list_columns
+                   else df[column].to_numpy() for column in df.columns}
+        return cls(columns, vocabulary)
+
+    def __len__(self) -> int:
+        column = next(iter(self.columns.values()))
+        return len(column)
+
+    def __getitem__(self, column: str):
+        return self.columns[column]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the arrays of the table, without the names of the vocabulary
+        """
+        return sum(column.nbytes for column in self.columns.values())
+
+    def take(self, rows: np.ndarray) -> 'CompactTable':
+        """
+        Select some rows
+
+        @param rows: Boolean mask or positions of the rows
+        @return: A new table with the selected rows, sharing the vocabulary
+        """
+        return CompactTable({name: column.take(rows) if isinstance(column, ListColumn) else column[rows]
+                             for name, column in self.columns.items()}, self.vocabulary)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Convert the table to a Dataframe with the list columns as Python lists
+
+        @return: A Pandas Dataframe, as load_dataset returns it
+        """
+        return pd.DataFrame({name: column.to_lists() if isinstance(column, ListColumn) else column
+                             for name, column in self.columns.items()})
+
+
+def load_compact_dataset(name: str, columns: list[str] = None, storage_format: str = STORAGE_FORMAT) -> CompactTable:
+    """
+    Load a dataset of the data folder as a compact table. The list columns of the parquet files are read without
+    creating any Python list, the ones of the csv files are split and interned while they are read
+
+    @param name: Name of the dataset, a key of LIST_COLUMNS
+    @param columns: Columns to read, all of them by default
+    @param storage_format: CSV_FORMAT or PARQUET_FORMAT
+    @return: The compact table of the dataset
+    """
+    vocabulary = Vocabulary()
+    storage_format = saved_format(name, storage_format)
+    if storage_format == PARQUET_FORMAT:
+        _, parquet = _parquet()
+        table = parquet.read_table(dataset_path(name, PARQUET_FORMAT), columns=columns, memory_map=True)
+        return CompactTable({column: ListColumn.from_arrow(table.column(column), vocabulary)
+                             if column in LIST_COLUMNS[name] else table.column(column).to_numpy()
+                             for column in table.column_names}, vocabulary)
+
+    df = pd.read_csv(dataset_path(name, CSV_FORMAT), usecols=columns)
+    return CompactTable({column: ListColumn.from_lists(df[column].map(_split), vocabulary)
+                         if column in LIST_COLUMNS[name] else df[column].to_numpy()
+                         for column in df.columns}, vocabulary)
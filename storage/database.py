@@ -0,0 +1,339 @@
+import logging
+import re
+import sqlite3
+
+import pandas as pd
+
+from constants import FILM_DATABASE_PATH
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS films (
+    film_id INTEGER PRIMARY KEY,  -- FilmAffinity id
+    title TEXT NOT NULL,
+    url TEXT,
+    duration INTEGER,  -- minutes
+    updated TEXT
+);
+CREATE INDEX IF NOT EXISTS films_title ON films (title);
+
+CREATE TABLE IF NOT EXISTS people (person_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS genres (genre_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS countries (country_id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+
+CREATE TABLE IF NOT EXISTS credits (
+    film_id INTEGER NOT NULL REFERENCES films,
+    role TEXT NOT NULL,  -- director, actor or producer
+    position INTEGER NOT NULL,
+    person_id INTEGER NOT NULL REFERENCES people,
+    PRIMARY KEY (film_id, role, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS credits_person ON credits (person_id, role);
+
+CREATE TABLE IF NOT EXISTS film_genres (
+    film_id INTEGER NOT NULL REFERENCES films,
+    genre_id INTEGER NOT NULL REFERENCES genres,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (film_id, genre_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS film_genres_genre ON film_genres (genre_id);
+
+CREATE TABLE IF NOT EXISTS film_countries (
+    film_id INTEGER NOT NULL REFERENCES films,
+    country_id INTEGER NOT NULL REFERENCES countries,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (film_id, country_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS film_countries_country ON film_countries (country_id);
+
+-- films of the top 1000 FA and of the current releases, in the order of the last run
+CREATE TABLE IF NOT EXISTS listings (
+    listing TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    film_id INTEGER NOT NULL REFERENCES films,
+    PRIMARY KEY (listing, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS listings_film ON listings (film_id);
+
+CREATE TABLE IF NOT EXISTS box_office (
+    position INTEGER PRIMARY KEY,
+    film_id INTEGER NOT NULL REFERENCES films,
+    genre TEXT,
+    weeks INTEGER,
+    weekend_gross INTEGER,
+    total_gross INTEGER
+);
+CREATE INDEX IF NOT EXISTS box_office_film ON box_office (film_id);
+
+-- netflix releases, most voted and best content
+CREATE TABLE IF NOT EXISTS netflix_rankings (
+    ranking TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    film_id INTEGER NOT NULL REFERENCES films,
+    release_date TEXT,
+    n_votes INTEGER,
+    rating REAL,
+    PRIMARY KEY (ranking, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS netflix_rankings_film ON netflix_rankings (film_id);
+'''
+
+# name of the netflix datasets in the netflix_rankings table
+NETFLIX_RANKINGS = {
+    'netflix_releases': 'releases',
+    'netflix_most_voted': 'most_voted',
+    'netflix_best': 'best',
+}
+
+# SQLite allows at most 999 parameters in a statement in old versions
+BATCH_SIZE = 500
+
+
+def _value(value):
+    # missing values of pandas (NaN, NaT, pd.NA) are saved as NULL
+    if value is None or isinstance(value, list):
+        return value
+    return None if pd.isna(value) else value
+
+
+def _number(value) -> int | None:
+    # numbers written with separators or units, like "$ 45,200,000", "35,863" or "115 min."
+    value = _value(value)
+    if value is None or isinstance(value, (int, float)):
+        return None if value is None else int(value)
+    digits = re.sub(r'\D', '', value)
+    return int(digits) if digits else None
+
+
+def _columns(df: pd.DataFrame, columns: list[str]) -> list[list]:
+    # values of every row, as Python values that sqlite can save
+    return [[_value(value) for value in values] for values in zip(*(df[column].tolist() for column in columns))]
+
+
+class FilmStore(object):
+    def __init__(self, path: str = FILM_DATABASE_PATH):
+        """
+        Normalized SQLite database of the films, written by the scrapers alongside the datasets. Every dataset is
+        saved in a single transaction, so a failed run does not leave it half written
+
+        @param path: Path of the database file
+        """
+        self.path = path
+        self._connection = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            # the scrapers can run at the same time in different processes, they wait for the lock of the others
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute('PRAGMA journal_mode = WAL')
+            self._connection.execute('PRAGMA synchronous = NORMAL')
+            self._connection.execute('PRAGMA foreign_keys = ON')
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def save(self, df: pd.DataFrame, name: str) -> None:
+        """
+        Save a dataset, replacing the data that the previous run saved from it
+
+        @param df: Dataset, its list columns contain lists of strings (or None)
+        @param name: Name of the dataset, a key of storage.LIST_COLUMNS
+        @return: None
+        """
+        if 'Film_id' not in df.columns:
+            logger.warning(f"The {name} dataset has no film id, it is not saved in the database")
+            return
+
+        saved = df['Film_id'].notna() & df['Title'].notna()
+        if not saved.all():
+            logger.warning(f"{(~saved).sum()} films of the {name} dataset have no film id or title, they are not "
+                           f"saved in the database")
+        df = df[saved].reset_index(drop=True)
+
+        with self.connection as connection:
+            cursor = connection.cursor()
+            if name == 'top_films':
+                self._save_top_films(cursor, df)
+            elif name == 'releases':
+                self._save_releases(cursor, df)
+            elif name == 'box_office':
+                self._save_box_office(cursor, df)
+            elif name in NETFLIX_RANKINGS:
+                self._save_netflix(cursor, df, NETFLIX_RANKINGS[name])
+        logger.info(f"{len(df)} films of the {name} dataset saved in the database")
+
+    def _save_films(self, cursor: sqlite3.Cursor, df: pd.DataFrame) -> list[int]:
+        """
+        Insert the films of a dataset or update their title
+
+        @param cursor: Cursor of the transaction
+        @param df: Dataset with the columns Film_id and Title
+        @return: The film id of every row
+        """
+        rows = _columns(df, ['Film_id', 'Title'])
+        cursor.executemany('INSERT INTO films (film_id, title) VALUES (?, ?) '
+                           'ON CONFLICT (film_id) DO UPDATE SET title = excluded.title', rows)
+        return [film_id for film_id, _ in rows]
+
+    def _name_ids(self, cursor: sqlite3.Cursor, table: str, key: str, names: set[str]) -> dict[str, int]:
+        """
+        Insert the new names of a table of names (people, genres or countries)
+
+        @param cursor: Cursor of the transaction
+        @param table: Name of the table
+        @param key: Primary key of the table
+        @param names: Names to insert
+        @return: Dictionary with the id of every name
+        """
+        names = sorted(names)
+        cursor.executemany(f'INSERT OR IGNORE INTO {table} (name) VALUES (?)', [(name,) for name in names])
+        ids = dict()
+        for start in range(0, len(names), BATCH_SIZE):
+            batch = names[start:start + BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            ids.update(cursor.execute(f'SELECT name, {key} FROM {table} WHERE name IN ({placeholders})', batch))
+        return ids
+
+    def _replace_links(self, cursor: sqlite3.Cursor, film_ids: list[int], lists: list, table: str,
+                       name_table: str, key: str, role: str = None) -> None:
+        """
+        Replace the people, genres or countries of the films
+
+        @param cursor: Cursor of the transaction
+        @param film_ids: Film id of every row
+        @param lists: List of names of every row (or None)
+        @param table: Table of the links (credits, film_genres or film_countries)
+        @param name_table: Table of the names (people, genres or countries)
+        @param key: Primary key of the table of the names
+        @param role: Role of the people in the credits
+        @return: None
+        """
+        ids = self._name_ids(cursor, name_table, key, {name for names in lists if names for name in names})
+        role_filter = ' AND role = ?' if role else ''
+        cursor.executemany(f'DELETE FROM {table} WHERE film_id = ?{role_filter}',
+                           [(film_id, role) if role else (film_id,) for film_id in film_ids])
+
+        links = [(film_id, position, ids[name])
+                 for film_id, names in zip(film_ids, lists) if names for position, name in enumerate(names)]
+        if role:
+            cursor.executemany('INSERT OR IGNORE INTO credits (film_id, position, person_id, role) VALUES (?, ?, ?, ?)',
+                               [link + (role,) for link in links])
+        else:
+            cursor.executemany(f'INSERT OR IGNORE INTO {table} (film_id, position, {key}) VALUES (?, ?, ?)', links)
+
+    def _replace_listing(self, cursor: sqlite3.Cursor, listing: str, film_ids: list[int]) -> None:
+        cursor.execute('DELETE FROM listings WHERE listing = ?', (listing,))
+        cursor.executemany('INSERT INTO listings (listing, position, film_id) VALUES (?, ?, ?)',
+                           [(listing, position, film_id) for position, film_id in enumerate(film_ids, 1)])
+
+    def _save_top_films(self, cursor: sqlite3.Cursor, df: pd.DataFrame) -> None:
+        film_ids = self._save_films(cursor, df)
+        if 'Url' in df.columns:
+            cursor.executemany('UPDATE films SET url = ?, updated = ? WHERE film_id = ?',
+                               [(url, updated, film_id) for film_id, url, updated
+                                in _columns(df.assign(Film_id=film_ids), ['Film_id', 'Url', 'Updated'])])
+        self._replace_links(cursor, film_ids, df['Directors'].tolist(), 'credits', 'people', 'person_id', 'director')
+        self._replace_links(cursor, film_ids, df['Actors'].tolist(), 'credits', 'people', 'person_id', 'actor')
+        self._replace_links(cursor, film_ids, df['genres'].tolist(), 'film_genres', 'genres', 'genre_id')
+        self._replace_listing(cursor, 'top_films', film_ids)
+
+    def _save_releases(self, cursor: sqlite3.Cursor, df: pd.DataFrame) -> None:
+        film_ids = self._save_films(cursor, df)
+        cursor.executemany('UPDATE films SET duration = ? WHERE film_id = ?',
+                           [(_number(duration), film_id)
+                            for film_id, duration in zip(film_ids, df['Duration'].tolist())])
+        self._replace_links(cursor, film_ids, df['Producers'].tolist(), 'credits', 'people', 'person_id', 'producer')
+        self._replace_listing(cursor, 'releases', film_ids)
+
+    def _save_box_office(self, cursor: sqlite3.Cursor, df: pd.DataFrame) -> None:
+        film_ids = self._save_films(cursor, df)
+        cursor.execute('DELETE FROM box_office')
+        cursor.executemany('INSERT INTO box_office (position, film_id, genre, weeks, weekend_gross, total_gross) '
+                           'VALUES (?, ?, ?, ?, ?, ?)',
+                           [(position, film_id, _value(genre), _number(weeks), _number(weekend), _number(total))
+                            for position, (film_id, genre, weeks, weekend, total)
+                            in enumerate(_columns(df.assign(Film_id=film_ids),
+                                                  ['Film_id', 'Genre', 'Weeks', 'Weekend Gross', 'Total Gross']), 1)])
+
+    def _save_netflix(self, cursor: sqlite3.Cursor, df: pd.DataFrame, ranking: str) -> None:
+        film_ids = self._save_films(cursor, df)
+        genres = df['genres' if 'genres' in df.columns else 'Genres'].tolist()
+        self._replace_links(cursor, film_ids, df['Origin_country'].tolist(), 'film_countries', 'countries',
+                            'country_id')
+
+        # the genres of the film pages (the films of the top films listing) are kept, the netflix ones are replaced
+        top_films = {film_id for film_id, in cursor.execute('SELECT film_id FROM listings WHERE listing = ?',
+                                                            ('top_films',))}
+        others = [(film_id, names) for film_id, names in zip(film_ids, genres) if film_id not in top_films]
+        self._replace_links(cursor, [film_id for film_id, _ in others], [names for _, names in others],
+                            'film_genres', 'genres', 'genre_id')
+
+        release_dates = pd.to_datetime(df['Release_date'], errors='coerce').dt.strftime('%Y-%m-%d').tolist()
+        n_votes = df['n_votes'].tolist() if 'n_votes' in df.columns else [None] * len(df)
+        ratings = pd.to_numeric(df['rating'], errors='coerce').tolist() if 'rating' in df.columns else [None] * len(df)
+        cursor.execute('DELETE FROM netflix_rankings WHERE ranking = ?', (ranking,))
+        cursor.executemany('INSERT INTO netflix_rankings (ranking, position, film_id, release_date, n_votes, rating) '
+                           'VALUES (?, ?, ?, ?, ?, ?)',
+                           [(ranking, position, film_id, _value(date), _number(votes), _value(rating))
+                            for position, (film_id, date, votes, rating)
+                            in enumerate(zip(film_ids, release_dates, n_votes, ratings), 1)])
+
+    def count_people(self, role: str, listing: str = 'top_films', limit: int = 20) -> list[tuple[str, int]]:
+        """
+        People with more films of a listing
+
+        @param role: director, actor or producer
+        @param listing: top_films or releases
+        @param limit: Number of people
+        @return: List of names and number of films, from the most frequent (the ties in order of first appearance)
+        """
+        return self.connection.execute(
+            'SELECT people.name, COUNT(*) AS n_films FROM listings '
+            'JOIN credits ON credits.film_id = listings.film_id AND credits.role = ? '
+            'JOIN people ON people.person_id = credits.person_id '
+            'WHERE listings.listing = ? GROUP BY people.person_id '
+            'ORDER BY n_films DESC, MIN(listings.position * 1000 + credits.position) LIMIT ?',
+            (role, listing, limit)).fetchall()
+
+    def count_genres(self, listing: str = 'top_films', limit: int = 20) -> list[tuple[str, int]]:
+        """
+        Genres with more films of a listing
+
+        @param listing: top_films or releases
+        @param limit: Number of genres
+        @return: List of genres and number of films, from the most frequent (the ties in order of first appearance)
+        """
+        return self.connection.execute(
+            'SELECT genres.name, COUNT(*) AS n_films FROM listings '
+            'JOIN film_genres ON film_genres.film_id = listings.film_id '
+            'JOIN genres ON genres.genre_id = film_genres.genre_id '
+            'WHERE listings.listing = ? GROUP BY genres.genre_id '
+            'ORDER BY n_films DESC, MIN(listings.position * 1000 + film_genres.position) LIMIT ?',
+            (listing, limit)).fetchall()
+
+    def count_collaborations(self, listing: str = 'top_films', limit: int = 12) -> list[tuple[str, str, int]]:
+        """
+        Directors and actors that worked together in more films of a listing
+
+        @param listing: top_films or releases
+        @param limit: Number of collaborations
+        @return: List of directors, actors and number of films, from the most frequent
+        """
+        return self.connection.execute(
+            'SELECT director.name, actor.name, COUNT(*) AS n_films FROM listings '
+            'JOIN credits AS directed ON directed.film_id = listings.film_id AND directed.role = \'director\' '
+            'JOIN credits AS acted ON acted.film_id = listings.film_id AND acted.role = \'actor\' '
+            'JOIN people AS director ON director.person_id = directed.person_id '
+            'JOIN people AS actor ON actor.person_id = acted.person_id '
+            'WHERE listings.listing = ? AND directed.person_id != acted.person_id '
+            'GROUP BY directed.person_id, acted.person_id '
+            'ORDER BY n_films DESC, MIN(listings.position) LIMIT ?', (listing, limit)).fetchall()
+
+
+film_store = FilmStore()
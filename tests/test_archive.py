@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from selenium.webdriver.common.by import By
+
+from scraper import top_films
+from scraper.utils import pool
+from scraper.utils.archive import PageArchive
+from scraper.utils.cache import html_cache
+from scraper.utils.registry import FilmRegistry
+from tests.test_http_backend import FixtureDriver, FIXTURES_PATH, FILMS
+from constants import SELENIUM_BACKEND, RECORD_MODE, REPLAY_MODE
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'pages.jsonl.gz')
+        self.title_list = [(title, Path(FIXTURES_PATH, page).as_uri()) for title, page in FILMS]
+
+        patch = mock.patch.object(html_cache, 'enabled', False)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def run_session(self, archive: PageArchive, driver) -> tuple[list, str, str]:
+        """
+        Calls of a run with two scrapers sharing the session: the first one crawls the film pages with the browser
+        of the session and the second one reads a page after it
+
+        @param archive: Archive of the run
+        @param driver: Driver of the session, already wrapped by the archive
+        @return: The extracted films, and the html and url read by the second scraper
+        """
+        with mock.patch.object(pool, 'page_archive', archive), \
+                mock.patch.object(pool, 'film_registry', FilmRegistry()):
+            films = pool.crawl_pages(driver, self.title_list, top_films.get_data, 1, SELENIUM_BACKEND, None,
+                                     parse_only=top_films.FILM_SCOPE, locator=top_films.FILM_LOCATOR)
+
+        driver.get(self.title_list[0][1])
+        driver.find_element(By.CSS_SELECTOR, '.card-producer')
+        return films, driver.page_source, driver.current_url
+
+    def test_selenium_round_trip(self) -> None:
+        recorder = PageArchive(self.path, RECORD_MODE)
+        recorder.open()
+        recorded = self.run_session(recorder, recorder.wrap(FixtureDriver()))
+        recorder.close()
+
+        replayer = PageArchive(self.path, REPLAY_MODE)
+        replayer.open()
+        replayed = self.run_session(replayer, replayer.wrap(None))
+
+        self.assertEqual(replayed, recorded)
+        self.assertEqual([title for title, _, _ in replayed[0]], [title for title, _ in FILMS])
+        # every recorded call of the session was consumed in the same order
+        self.assertEqual(len(replayer._calls), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import threading
+import unittest
+from unittest import mock
+
+from scraper.utils import driver
+from scraper.utils.archive import PageArchive
+from constants import RECORD_MODE, REPLAY_MODE
+
+
+class _Browser(object):
+    # stands in for Firefox, only quit is called
+    def quit(self) -> None:
+        pass
+
+
+class TestBrowserSlots(unittest.TestCase):
+    def setUp(self) -> None:
+        self.slots = threading.BoundedSemaphore(1)
+        driver.set_browser_slots(self.slots)
+        self.addCleanup(driver.set_browser_slots, None)
+
+    def test_created_driver_frees_its_slot(self) -> None:
+        with mock.patch.object(driver.webdriver, 'Firefox', return_value=_Browser()):
+            browser = driver.create_driver(lean=False)
+        self.assertFalse(self.slots.acquire(False))
+        # the driver of a recorded session is wrapped by the archive
+        driver.quit_driver(PageArchive(None, RECORD_MODE).wrap(browser))
+        self.assertTrue(self.slots.acquire(False))
+
+    def test_replay_driver_holds_no_slot(self) -> None:
+        session = driver.BrowserSession()
+        session.driver = PageArchive(None, REPLAY_MODE).wrap(None)
+        session.close()
+        # a release without an acquire would raise ValueError in the bounded semaphore
+        self.assertTrue(self.slots.acquire(False))
+        self.assertFalse(self.slots.acquire(False))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import os
+import threading
+import unittest
+import urllib.request
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from scraper import top_films, releases
+from scraper.utils import pool
+from scraper.utils.cache import html_cache
+from scraper.utils.registry import FilmRegistry
+from constants import SELENIUM_BACKEND, HTTP_BACKEND, ASYNC_BACKEND
+
+FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
+FILMS = [('The Godfather', 'film809297.html'), ('Seven Samurai', 'film695552.html'), ('Persona', 'film370979.html')]
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+
+class FixtureDriver(object):
+    def __init__(self):
+        """
+        Stands in for the browser of the selenium backend: it loads the page in get() and returns its html in
+        page_source, the same calls that get_page_source makes to Firefox
+        """
+        self.current_url = None
+        self.page_source = None
+
+    def get(self, url: str) -> None:
+        self.current_url = url
+        with urllib.request.urlopen(url) as response:
+            self.page_source = response.read().decode('utf-8')
+
+    def find_element(self, by: str, value: str):
+        # the saved pages are complete, the element waited for is always there
+        return True
+
+
+class TestHttpBackend(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        handler = partial(_QuietHandler, directory=FIXTURES_PATH)
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{cls.server.server_address[1]}/'
+        cls.title_list = [(title, url + page) for title, page in FILMS]
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        # the pages are always downloaded from the server, never read from the cache on disk
+        patch = mock.patch.object(html_cache, 'enabled', False)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def crawl(self, module, backend: str) -> list:
+        """
+        Extract the saved pages with the extractor of a scraper
+
+        @param module: Scraper, top_films or releases
+        @param backend: SELENIUM_BACKEND, HTTP_BACKEND or ASYNC_BACKEND
+        @return: The title, url and extracted data of every film
+        """
+        # a single browser worker, the other ones would start Firefox
+        driver, n_workers = (FixtureDriver(), 1) if backend == SELENIUM_BACKEND else (None, 2)
+        # a new registry, so the pages downloaded by another crawl are not reused
+        with mock.patch.object(pool, 'film_registry', FilmRegistry()):
+            return pool.crawl_pages(driver, self.title_list, module.get_data, n_workers, backend, None,
+                                    parse_only=module.FILM_SCOPE, locator=module.FILM_LOCATOR)
+
+    def test_top_films_get_data(self) -> None:
+        films = self.crawl(top_films, HTTP_BACKEND)
+        self.assertEqual(films, self.crawl(top_films, SELENIUM_BACKEND))
+        self.assertEqual(films, self.crawl(top_films, ASYNC_BACKEND))
+        self.assertEqual([title for title, _, _ in films], [title for title, _ in FILMS])
+        self.assertEqual(films[0][2], (['Francis Ford Coppola'], ['Drama', 'Mafia', 'Crime', '1940s'],
+                                       ['Marlon Brando', 'Al Pacino', 'James Caan', 'Robert Duvall']))
+        # the films without the debug cast take the actors of card-cast
+        self.assertEqual(films[1][2][2], ['Toshirô Mifune', 'Takashi Shimura', 'Keiko Tsushima'])
+
+    def test_releases_get_data(self) -> None:
+        films = self.crawl(releases, HTTP_BACKEND)
+        self.assertEqual(films, self.crawl(releases, SELENIUM_BACKEND))
+        self.assertEqual(films, self.crawl(releases, ASYNC_BACKEND))
+        self.assertEqual(films[0][2], (['Paramount Pictures', 'Alfran Productions'], '175 min.'))
+        self.assertEqual(films[2][2], (['Svensk Filmindustri (SF)'], '83 min.'))
+
+
+if __name__ == '__main__':
+    unittest.main()
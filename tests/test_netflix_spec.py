@@ -0,0 +1,51 @@
+import json
+import unittest
+
+from benchmark.extract_benchmark import make_card, make_page, legacy_card
+from scraper.netflix import CARDS_SCOPE, VOTED_CARD_SPEC
+from scraper.utils.document import Document
+
+# Cards where the first match of a selector is not the value read before the specs
+EDGE_CARDS = [
+    # flags in a second div without class, only the first one is read
+    '''<div class="top-movie"><div class="mc-data">
+         <div class="mc-title"><a href="/us/film1.html" title="One">One</a></div>
+         <div><img class="nflag" alt="Spain"></div>
+         <div><img class="nflag" alt="France"></div>
+       </div></div>''',
+    # a types-wrapper without types, the genre links are not read
+    '''<div class="top-movie"><div class="mc-data">
+         <div class="mc-title"><a href="/us/film2.html" title="Two">Two</a></div>
+         <div class="types-wrapper"></div><a class="genre" href="#">Drama</a>
+       </div></div>''',
+    # the first div without class has no flags
+    '''<div class="top-movie"><div class="mc-data">
+         <div><span class="date">2001</span></div>
+         <div><img class="nflag" alt="Italy"></div>
+       </div></div>''',
+    # no card data nor genres
+    '''<div class="top-movie"><img class="nflag" alt="Japan"><span class="type">Anime</span></div>''',
+]
+
+
+class TestNetflixSpec(unittest.TestCase):
+    def assert_same_cards(self, html: str) -> None:
+        cards = Document(html, CARDS_SCOPE).find_all("div", class_="top-movie")
+        self.assertEqual(VOTED_CARD_SPEC.extract_all(cards), [legacy_card(card) for card in cards])
+
+    def test_synthetic_page(self) -> None:
+        self.assert_same_cards(make_page(50))
+
+    def test_edge_cards(self) -> None:
+        self.assert_same_cards('<html><body>' + ''.join(EDGE_CARDS + [make_card(1)]) + '</body></html>')
+
+    def test_script_definition(self) -> None:
+        # the definition is sent to CARDS_SCRIPT as an argument of execute_script
+        definition = VOTED_CARD_SPEC.definition()
+        self.assertEqual(json.loads(json.dumps(definition)), definition)
+        genres = next(field for field in definition if field['name'] == 'genres')
+        self.assertEqual(genres['alternatives'], [['.types-wrapper', '.type'], [None, 'a.genre']])
+
+
+if __name__ == '__main__':
+    unittest.main()
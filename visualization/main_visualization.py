@@ -1,18 +1,27 @@
-from visualization.netflix_visualization import start_visualization as netflix_visualization
-from visualization.releases_visualization import start_visualization as releases_visualization
-from visualization.top_films_visualization import start_visualization as top_films_visualization
-
+import importlib
 import logging
 
+from log.metrics import metrics
+from log.profiling import profiler
+
+# name of every visualization and the module of its start_visualization, the module is imported only if the
+# visualization runs
+VISUALIZATIONS = {
+    'netflix': 'visualization.netflix_visualization',
+    'releases': 'visualization.releases_visualization',
+    'top_films': 'visualization.top_films_visualization',
+}
+
 
-def main() -> None:
+def main(names: list[str] | None = None) -> None:
     """
     This function initialize the visualization of all data obtained
 
+    @param names: Names of the visualizations to execute, in this order. All of them by default
     @return: Show all the data located in the several csv located in the data folder
     """
     logger = logging.getLogger("visualization")
     # execute visualizations
-    netflix_visualization()
-    releases_visualization()
-    top_films_visualization()
+    for name in names or VISUALIZATIONS:
+        with metrics.stage(f'visualization.{name}'), profiler.stage(f'visualization.{name}'):
+            importlib.import_module(VISUALIZATIONS[name]).start_visualization()
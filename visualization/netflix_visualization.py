@@ -9,7 +9,9 @@ import pandas as pd
 import numpy as np
 
 from visualization import logger
-from constants import DATA_PATH, IMAGES_PATH, MONTH_NAMES
+from log.metrics import metrics
+from storage import load_dataset
+from constants import IMAGES_PATH, MONTH_NAMES
 
 
 def visualization_popular_best(df_best: pd.DataFrame, df_votes: pd.DataFrame) -> None:
@@ -95,8 +97,8 @@ def visualization_next_release(df_releases: pd.DataFrame) -> None:
         year = row['Release_date'].year
         month = row['Release_date'].month
         day = row['Release_date'].day
-        genres = str(row['genres'])[1:-1].replace("'", "")
-        origin_country = row['Origin_country']
+        genres = ', '.join(row['genres'] or [])
+        origin_country = ', '.join(row['Origin_country'] or [])
         title = row['Title']
         if year not in data.keys():
             data[year] = {}
@@ -139,10 +141,10 @@ def data_cleaning() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
 
     @return: 2 different df that will be used for the data visualization
     """
-    # load csv
-    df_best = pd.read_csv(os.path.join(DATA_PATH, 'netflix_best.csv'))
-    df_votes = pd.read_csv(os.path.join(DATA_PATH, 'netflix_most_voted.csv'))
-    df_releases = pd.read_csv(os.path.join(DATA_PATH, 'netflix_releases.csv'))
+    # load the datasets, the genres and countries are loaded as lists
+    df_best = load_dataset('netflix_best')
+    df_votes = load_dataset('netflix_most_voted')
+    df_releases = load_dataset('netflix_releases')
 
     # rename "Genres" to "genres"
     df_best = df_best.rename(columns={'Genres': 'genres'})
@@ -184,11 +186,6 @@ def data_cleaning() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
     df_votes['rating'] = df_votes['rating'].apply(
         lambda x: re.search(regex, str(x)).group().replace('.', '') if x and re.search(regex, str(x)) else None)
 
-    # clean genres
-    df_releases['genres'] = df_releases['genres'].apply(lambda x: str(x).split(', ') if str(x).split(',') else None)
-    df_votes['genres'] = df_votes['genres'].apply(lambda x: str(x).split(', ') if str(x).split(',') else None)
-    df_best['genres'] = df_best['genres'].apply(lambda x: str(x).split(', ') if str(x).split(',') else None)
-
     # clean dates
     df_releases['Release_date'] = pd.to_datetime(df_releases['Release_date'])
 
@@ -196,11 +193,14 @@ def data_cleaning() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
 
 
 def start_visualization() -> None:
-    df_releases, df_best, df_votes = data_cleaning()
+    with metrics.stage('visualization.netflix.data_cleaning'):
+        df_releases, df_best, df_votes = data_cleaning()
 
     # start visualizations
-    visualization_next_release(df_releases)
+    with metrics.stage('visualization.netflix.next_release'):
+        visualization_next_release(df_releases)
     logger.info("Visualization for netflix next releases succeed")
 
-    visualization_popular_best(df_best, df_votes)
+    with metrics.stage('visualization.netflix.popular_best'):
+        visualization_popular_best(df_best, df_votes)
     logger.info("Visualization of the popular/best netflix content succeed")
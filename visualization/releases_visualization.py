@@ -7,7 +7,9 @@ import matplotlib.patches as mpatches
 import pandas as pd
 
 from visualization import logger
-from constants import DATA_PATH, IMAGES_PATH, COLORS
+from log.metrics import metrics
+from storage import load_dataset
+from constants import IMAGES_PATH, COLORS
 
 
 def visualization_box_office(df_join: pd.DataFrame) -> None:
@@ -95,9 +97,9 @@ def data_cleaning() -> tuple[pd.DataFrame, pd.DataFrame]:
 
     @return: 2 different df that will be used for the data visualization
     """
-    # load csv
-    df_box_office = pd.read_csv(os.path.join(DATA_PATH, 'box_office.csv'))
-    df_releases = pd.read_csv(os.path.join(DATA_PATH, 'releases.csv'))
+    # load the datasets, the producers are loaded as lists
+    df_box_office = load_dataset('box_office')
+    df_releases = load_dataset('releases')
 
     # clean columns
     df_box_office = df_box_office.drop(columns=['#', 'Genre'])
@@ -137,25 +139,32 @@ def data_cleaning() -> tuple[pd.DataFrame, pd.DataFrame]:
     df_releases_aux['Duration'] = df_releases_aux['Duration'].apply(
         lambda x: re.search(regex, x).group() if x and re.search(regex, str(x)) else None)
 
-    # join the 2 dataframes by the colum 'Title'
-    df_join = pd.merge(df_releases_aux, df_box_office, on='Title')
+    # join the 2 dataframes by the film id, or by the colum 'Title' if the csv were scraped without it
+    if 'Film_id' in df_box_office.columns and df_box_office['Film_id'].notna().any() \
+            and 'Film_id' in df_releases_aux.columns:
+        df_join = pd.merge(df_releases_aux, df_box_office.drop(columns=['Title']), on='Film_id')
+    else:
+        df_join = pd.merge(df_releases_aux, df_box_office.drop(columns=['Film_id'], errors='ignore'), on='Title')
 
     # clean the producers
     df_releases = df_releases.dropna(subset=['Producers'])
+    # the csv files scraped before the producers were a list keep the distributor after the producers
     df_releases['Producers'] = df_releases['Producers'].apply(
-        lambda x: str(x).split('Distributor')[0].strip().replace('.', '').split(', ') if str(x).split(
-            'Distributor') else None)
+        lambda producers: ', '.join(producers).split('Distributor')[0].strip().replace('.', '').split(', '))
     logger.info("Data preprocessed correctly")
 
     return df_join, df_releases
 
 
 def start_visualization() -> None:
-    df_join, df_releases = data_cleaning()
+    with metrics.stage('visualization.releases.data_cleaning'):
+        df_join, df_releases = data_cleaning()
 
     # start visualizations
-    visualization_producers(df_releases)
+    with metrics.stage('visualization.releases.producers'):
+        visualization_producers(df_releases)
     logger.info("Visualization producers succeed")
 
-    visualization_box_office(df_join)
+    with metrics.stage('visualization.releases.box_office'):
+        visualization_box_office(df_join)
     logger.info("Visualization of box office succeed")
@@ -6,43 +6,25 @@ import matplotlib.pyplot as plt
 import networkx as nx
 
 from visualization import logger
-from constants import DATA_PATH
-from constants import IMAGES_PATH
+from log.metrics import metrics
+from storage.compact import CompactTable, load_compact_dataset, rank
+from storage.database import film_store
+from constants import IMAGES_PATH, FILM_DATABASE
 
 
-def convert_to_list(string: str) -> list:
-    """
-    Auxiliar function to convert a string to a list (necessary to load the info of the df)
-
-    @param string: string to be converted to list
-    @return:  the string split as list
-    """
-
-    # eliminate the brackets and quotes and split the string by commas
-    if string:
-        return string.strip('][').replace("'", "").split(', ')
-    else:
-        return []
-
-
-def visualization_collaboration(df_directors_actors: pd.DataFrame) -> None:
+def visualization_collaboration(films_directors_actors: CompactTable) -> None:
     """
     A plot that shows the collaboration between directors and actors
 
-    @param df_directors_actors: Dataframe with no missing director or actor
+    @param films_directors_actors: Films with no missing director or actor
     @return: A plot that shows the collaboration between directors and actors
     """
 
-    # convert strings to a real list
-    df_directors_actors['Directors'] = df_directors_actors['Directors'].apply(convert_to_list)
-    df_directors_actors['Actors'] = df_directors_actors['Actors'].apply(convert_to_list)
-
-    # create new column to combine actors and directors to a list for every film
-    df_directors_actors['Collaboration'] = df_directors_actors.apply(
-        lambda row: [(direct, act) for direct in row['Directors'] for act in row['Actors']], axis=1)
-
-    # convert the collaborations list into a serie to count the frequencies
-    collaborations_series = df_directors_actors['Collaboration'].explode().value_counts()
+    # count every pair of director and actor of the same film by their ids, from the most frequent (the ties in the
+    # order of value_counts, so the same collaborations are drawn)
+    pairs = films_directors_actors['Directors'].join(films_directors_actors['Actors'])
+    directors_ids, actors_ids, counts = rank(*pairs, value_counts=True)
+    names = films_directors_actors.vocabulary.names
 
     # get the actors, directors and number of collaborations of all films
     top_collaborations = list()
@@ -50,7 +32,8 @@ def visualization_collaboration(df_directors_actors: pd.DataFrame) -> None:
     directors = set()
     # change the number to add more collaborations
     n_collaborations = 12
-    for (director, actor), count in collaborations_series.items():
+    for director, actor, count in zip(directors_ids.tolist(), actors_ids.tolist(), counts.tolist()):
+        director, actor = names[director], names[actor]
         if actor != director:
             if n_collaborations == 0:
                 break
@@ -105,40 +88,24 @@ def visualization_collaboration(df_directors_actors: pd.DataFrame) -> None:
     plt.savefig(os.path.join(IMAGES_PATH, 'collaboration_directors_actors.png'))
 
 
-def visualization_frequency_actors_directors_genres(df_genres_actors_directors: pd.DataFrame) -> None:
+def visualization_frequency_actors_directors_genres(films: CompactTable) -> None:
     """
     Saves a plot that shows the top 20 genres,20 directors and 20 actors in the top 1000 films
 
-    @param df_genres_actors_directors: Dataframe with no missing genres, actors or directors in the same row
+    @param films: Films with no missing genres, actors or directors in the same row
     @return: A dictionary containing the number of appearance of each genre
     """
-    # count genres
-    counting_genres = {}
-    df_genres_actors_directors['genres'].apply(
-        lambda genres: [counting_genres.update({genre.strip(): counting_genres.get(genre.strip(), 0) + 1}) for genre in
-                        str(genres).split(',') if isinstance(genres, str) and not pd.isnull(genres)])
-
-    # count directors
-    counting_directors = {}
-    df_genres_actors_directors['Directors'].apply(lambda directors: [
-        counting_directors.update({director.strip(): counting_directors.get(director.strip(), 0) + 1}) for director in
-        str(directors).split(',') if isinstance(directors, str) and not pd.isnull(directors)])
-
-    # count actors
-    counting_actors = {}
-    df_genres_actors_directors['Actors'].apply(
-        lambda actors: [counting_actors.update({actor.strip(): counting_actors.get(actor.strip(), 0) + 1}) for actor in
-                        str(actors).split(',') if isinstance(actors, str) and not pd.isnull(actors)])
-
-    # order the data
-    counting_genres_sorted = dict(sorted(counting_genres.items(), key=lambda item: item[1], reverse=True))
-    counting_directors_sorted = dict(sorted(counting_directors.items(), key=lambda item: item[1], reverse=True))
-    counting_actors_sorted = dict(sorted(counting_actors.items(), key=lambda item: item[1], reverse=True))
-
     top_n = 20
-    top_20_genres = dict(list(counting_genres_sorted.items())[:top_n])
-    top_20_directors = dict(list(counting_directors_sorted.items())[:top_n])
-    top_20_actors = dict(list(counting_actors_sorted.items())[:top_n])
+    if FILM_DATABASE and film_store.count_genres('top_films', 1):
+        # indexed aggregate queries of the film database instead of counting the lists of every film
+        top_20_genres = dict(film_store.count_genres('top_films', top_n))
+        top_20_directors = dict(film_store.count_people('director', 'top_films', top_n))
+        top_20_actors = dict(film_store.count_people('actor', 'top_films', top_n))
+    else:
+        # count the ids of the names of every column
+        top_20_genres = dict(films['genres'].top(top_n))
+        top_20_directors = dict(films['Directors'].top(top_n))
+        top_20_actors = dict(films['Actors'].top(top_n))
 
     # create figure with 3 plots
     fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(18, 6))
@@ -178,45 +145,34 @@ def visualization_frequency_actors_directors_genres(df_genres_actors_directors:
     plt.savefig(os.path.join(IMAGES_PATH, 'combined_plot.png'))
 
 
-def data_cleaning() -> tuple[pd.DataFrame, pd.DataFrame]:
+def data_cleaning() -> tuple[CompactTable, CompactTable]:
     """
     Extract and clean the data to be used in the different visualizations
 
-    @return: 2 different df that will be used for the data visualization
+    @return: 2 different tables of films that will be used for the data visualization
     """
-    df = pd.read_csv(os.path.join(DATA_PATH, 'top_films.csv'))
+    # the directors, genres and actors are loaded as arrays of ids of their names
+    films = load_compact_dataset('top_films', columns=['Title', 'Directors', 'genres', 'Actors'])
 
     # Check if all films have title
-    films_no_title = list(df[df['Title'].isnull()].index)
-    if films_no_title:
-        logger.info(f"There are {len(films_no_title)} that doesn't have title")
+    films_no_title = pd.isnull(films['Title'])
+    if films_no_title.any():
+        logger.info(f"There are {films_no_title.sum()} that doesn't have title")
         # Drop films with no title
-        df = df.dropna(subset=['Title'])
-
-    # df to return
-    df_directors_actors = df.copy()
-    df_genres_actors_directors = df.copy()
+        films = films.take(~films_no_title)
 
-    # check if all films have director
-    df_directors_actors = df_directors_actors.dropna(subset=['Directors'])
-
-    # check if all films have actor
-    df_directors_actors = df_directors_actors.dropna(subset=['Actors'])
+    # check if all films have director and actor
+    films_directors_actors = films.take(films['Directors'].has_values() & films['Actors'].has_values())
 
     # check if all films have genre, actor or director
-    rows_with_missing_data = df[df[['Directors', 'genres', 'Actors']].isna().all(axis=1)]
-    if len(rows_with_missing_data) > 0:
+    rows_with_missing_data = ~(films['Directors'].has_values() | films['genres'].has_values()
+                               | films['Actors'].has_values())
+    if rows_with_missing_data.any():
         logger.error("There are films with all missing data")
-        print(rows_with_missing_data)
+        print(films['Title'][rows_with_missing_data])
         raise Exception("There are films with all missing data")
 
-    # Drop the unnecessary columns
-    df_directors_actors = df_directors_actors.drop('genres', axis=1)
-    df_directors_actors = df_directors_actors.drop('Title', axis=1)
-
-    df_genres_actors_directors = df_genres_actors_directors.drop('Title', axis=1)
-
-    return df_genres_actors_directors, df_directors_actors
+    return films, films_directors_actors
 
 
 def start_visualization() -> None:
@@ -225,10 +181,13 @@ def start_visualization() -> None:
 
     @return: Shows all the plots and save them into the folder images
     """
-    df_genres_actors_directors, df_directors_actors = data_cleaning()
+    with metrics.stage('visualization.top_films.data_cleaning'):
+        films, films_directors_actors = data_cleaning()
 
-    visualization_frequency_actors_directors_genres(df_genres_actors_directors)
+    with metrics.stage('visualization.top_films.frequency'):
+        visualization_frequency_actors_directors_genres(films)
     logger.info("Visualization for most appeared frequency succeed")
 
-    visualization_collaboration(df_directors_actors)
+    with metrics.stage('visualization.top_films.collaboration'):
+        visualization_collaboration(films_directors_actors)
     logger.info("Visualization of collaborations succeed")